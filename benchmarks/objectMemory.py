@@ -0,0 +1,177 @@
+import argparse
+import gc
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Measure the memory held by a loaded DSON file.
+# Examples:
+# python .\benchmarks\objectMemory.py
+# python .\benchmarks\objectMemory.py -m 4000 -n 200
+# python .\benchmarks\objectMemory.py -l
+
+# pymod modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import dson.reader
+import dson.types
+
+# command line options
+parser = argparse.ArgumentParser(
+    description='Measure the memory used by a loaded synthetic DSON file.'
+)
+parser.add_argument(
+    '-m',
+    dest='morphs',
+    metavar='COUNT',
+    type=int,
+    default=2000,
+    help='number of morph modifiers'
+)
+parser.add_argument(
+    '-n',
+    dest='nodes',
+    metavar='COUNT',
+    type=int,
+    default=100,
+    help='number of bones'
+)
+parser.add_argument(
+    '-d',
+    dest='deltas',
+    metavar='COUNT',
+    type=int,
+    default=20,
+    help='number of deltas per morph'
+)
+parser.add_argument(
+    '-l',
+    dest='lazy',
+    action='store_true',
+    default=False,
+    help='construct the library entries lazily and fetch one morph'
+)
+args = parser.parse_args()
+
+def channel(id, value, type='float'):
+    return {
+        'id': id,
+        'type': type,
+        'name': id,
+        'label': id.title(),
+        'value': value,
+        'current_value': value,
+        'min': -100,
+        'max': 100,
+        'clamped': False
+    }
+
+def channels(name, value):
+    return [channel(axis, value) for axis in ('x', 'y', 'z')]
+
+def synthetic(morphs, nodes, deltas):
+    rnd = random.Random(0)
+    nodeLibrary = []
+    for i in range(nodes):
+        node = {
+            'id': "bone{}".format(i),
+            'name': "bone{}".format(i),
+            'type': 'bone' if i else 'figure',
+            'label': "Bone {}".format(i),
+            'rotation_order': 'XYZ',
+            'center_point': channels('center_point', 0),
+            'end_point': channels('end_point', 0),
+            'orientation': channels('orientation', 0),
+            'rotation': channels('rotation', 0),
+            'translation': channels('translation', 0),
+            'scale': channels('scale', 1),
+            'general_scale': channel('general_scale', 1)
+        }
+        if i:
+            node['parent'] = "#bone{}".format(rnd.randrange(i))
+            pass
+        nodeLibrary.append(node)
+        pass
+    modifierLibrary = []
+    for i in range(morphs):
+        modifierLibrary.append({
+            'id': "morph{}".format(i),
+            'name': "morph{}".format(i),
+            'parent': '#bone0',
+            'presentation': {
+                'type': 'Modifier/Shape',
+                'label': "Morph {}".format(i),
+                'description': '',
+                'icon_large': '',
+                'colors': [[0.5, 0.5, 0.5], [1, 1, 1]]
+            },
+            'channel': channel('value', 0),
+            'region': 'Actor',
+            'group': '/Morphs',
+            'formulas': [{
+                'output': "bone0:#bone0?rotation/x/value",
+                'operations': [
+                    {'op': 'push', 'url': "morph{}:#morph{}?value".format(i, i)},
+                    {'op': 'push', 'val': rnd.random()},
+                    {'op': 'mult'}
+                ]
+            }],
+            'morph': {
+                'vertex_count': 20000,
+                'deltas': {
+                    'count': deltas,
+                    'values': [
+                        [rnd.randrange(20000), rnd.random(), rnd.random(),
+                         rnd.random()]
+                        for j in range(deltas)
+                    ]
+                }
+            }
+        })
+        pass
+    return {
+        'file_version': '0.6.0.0',
+        'asset_info': {'id': '/data/benchmark.dsf', 'type': 'figure'},
+        'node_library': nodeLibrary,
+        'modifier_library': modifierLibrary
+    }
+
+with tempfile.TemporaryDirectory() as tmpDir:
+    path = os.path.join(tmpDir, 'benchmark.dsf')
+    with gzip.open(path, 'wt') as fp:
+        json.dump(synthetic(args.morphs, args.nodes, args.deltas), fp)
+        pass
+    cache = dson.reader.Cache(prefetch=0, lazyLibraries=args.lazy)
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    daz = cache.loadURL(path)
+    if args.lazy:
+        daz.idGet("morph{}".format(args.morphs // 2))
+        pass
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # count the constructed objects
+    objects = sum(1 for obj in dson.types.forEach(daz, construct=False))
+    if args.lazy:
+        # forEach skipped the library entries
+        for asset in daz.assets:
+            objects += sum(1 for obj in dson.types.forEach(asset))
+            pass
+        pass
+    print("file:     {} bytes".format(os.path.getsize(path)))
+    print("objects:  {}".format(objects))
+    print("load:     {:.3f}s".format(elapsed))
+    print("resident: {:.1f} MB ({} bytes per object)".format(
+        current / (1024 * 1024), current // objects
+    ))
+    print("peak:     {:.1f} MB".format(peak / (1024 * 1024)))
+    pass
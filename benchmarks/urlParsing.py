@@ -0,0 +1,241 @@
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Measure the cost of parsing the urls of a reference heavy scene.
+# Examples:
+# python .\benchmarks\urlParsing.py
+# python .\benchmarks\urlParsing.py -i 4000 -r 5
+
+# pymod modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import dson.reader
+import dson.types
+import dson.utils
+
+# command line options
+parser = argparse.ArgumentParser(
+    description='Measure URL parsing with and without the URL cache.'
+)
+parser.add_argument(
+    '-i',
+    dest='instances',
+    metavar='COUNT',
+    type=int,
+    default=2000,
+    help='number of morph instances in the scene'
+)
+parser.add_argument(
+    '-n',
+    dest='nodes',
+    metavar='COUNT',
+    type=int,
+    default=100,
+    help='number of bones'
+)
+parser.add_argument(
+    '-r',
+    dest='repeat',
+    metavar='COUNT',
+    type=int,
+    default=3,
+    help='number of timed runs, the best is reported'
+)
+args = parser.parse_args()
+
+FIGURE = '/data/DAZ%203D/Genesis%208/Female/Genesis8Female.dsf'
+MORPHS = '/data/DAZ%203D/Genesis%208/Female/Morphs/Benchmark/Morphs.dsf'
+
+def figure(nodes):
+    rnd = random.Random(0)
+    nodeLibrary = []
+    for i in range(nodes):
+        node = {
+            'id': "bone{}".format(i),
+            'name': "bone{}".format(i),
+            'type': 'bone' if i else 'figure',
+            'rotation': [
+                {'id': axis, 'type': 'float', 'value': 0}
+                for axis in ('x', 'y', 'z')
+            ]
+        }
+        if i:
+            node['parent'] = "#bone{}".format(rnd.randrange(i))
+            pass
+        nodeLibrary.append(node)
+        pass
+    return {
+        'file_version': '0.6.0.0',
+        'asset_info': {'id': FIGURE, 'type': 'figure'},
+        'node_library': nodeLibrary
+    }
+
+def morphs(count, nodes):
+    rnd = random.Random(1)
+    modifierLibrary = []
+    for i in range(count):
+        bone = "bone{}".format(rnd.randrange(nodes))
+        modifierLibrary.append({
+            'id': "morph{}".format(i),
+            'name': "morph{}".format(i),
+            'parent': "{}#bone0".format(FIGURE),
+            'channel': {'id': 'value', 'type': 'float', 'value': 0},
+            'formulas': [{
+                'output': "{}:{}#{}?rotation/x/value".format(
+                    bone, FIGURE, bone
+                ),
+                'operations': [
+                    {'op': 'push',
+                     'url': "morph{}:#morph{}?value".format(i, i)},
+                    {'op': 'push', 'val': rnd.random()},
+                    {'op': 'mult'}
+                ]
+            }]
+        })
+        pass
+    return {
+        'file_version': '0.6.0.0',
+        'asset_info': {'id': MORPHS, 'type': 'modifier'},
+        'modifier_library': modifierLibrary
+    }
+
+def scene(count, nodes):
+    sceneNodes = [{'id': 'Genesis8Female', 'url': "{}#bone0".format(FIGURE)}]
+    for i in range(1, nodes):
+        sceneNodes.append({
+            'id': "bone{}".format(i),
+            'url': "{}#bone{}".format(FIGURE, i),
+            'parent': '#Genesis8Female'
+        })
+        pass
+    modifiers = []
+    animations = []
+    for i in range(count):
+        modifiers.append({
+            'id': "morph{}".format(i),
+            'url': "{}#morph{}".format(MORPHS, i),
+            'parent': '#Genesis8Female'
+        })
+        animations.append({
+            'url': "name://@selection#morph{}:?value/value".format(i),
+            'keys': [[0, 0], [1, 1]]
+        })
+        pass
+    return {
+        'file_version': '0.6.0.0',
+        'asset_info': {'id': '/Scenes/benchmark.duf', 'type': 'scene'},
+        'scene': {
+            'nodes': sceneNodes,
+            'modifiers': modifiers,
+            'animations': animations
+        }
+    }
+
+def urls(value):
+    # the url strings of the references in parsed DSON data
+    if isinstance(value, dict):
+        for key, child in value.items():
+            if key in ('url', 'parent', 'output') and isinstance(child, str):
+                yield child
+            else:
+                yield from urls(child)
+                pass
+            pass
+        pass
+    elif isinstance(value, list):
+        for child in value:
+            yield from urls(child)
+            pass
+        pass
+    pass
+
+def parseTime(strings, parse):
+    best = None
+    for run in range(args.repeat):
+        start = time.perf_counter()
+        for url in strings:
+            parse(url)
+            pass
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        pass
+    return best
+
+# the cached parser
+urlParse = dson.utils.urlParse
+
+def references(cache):
+    # the (object, url) pairs of the references of the loaded files
+    refs = []
+    for daz in cache.cache.values():
+        for obj in dson.types.forEach(daz):
+            for value in obj.values():
+                values = value if isinstance(value, list) else [value]
+                for ref in values:
+                    if isinstance(ref, dson.types.Ref):
+                        refs.append((obj, ref.url))
+                        pass
+                    pass
+                pass
+            pass
+        pass
+    return refs
+
+def resolveTime(refs, parse):
+    # the first (cold cache) and best (warm cache) times
+    times = []
+    dson.utils.urlParse = parse
+    urlParse.cache_clear()
+    for run in range(args.repeat):
+        start = time.perf_counter()
+        for obj, url in refs:
+            dson.types.urlGet(obj, url)
+            pass
+        times.append(time.perf_counter() - start)
+        pass
+    dson.utils.urlParse = urlParse
+    return times[0], min(times)
+
+def write(root, url, data):
+    path = os.path.join(root, dson.utils.URL(url).path.lstrip('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, 'wt') as fp:
+        json.dump(data, fp)
+        pass
+    return data
+
+with tempfile.TemporaryDirectory() as root:
+    data = [
+        write(root, FIGURE, figure(args.nodes)),
+        write(root, MORPHS, morphs(args.instances, args.nodes)),
+        write(root, '/Scenes/benchmark.duf', scene(args.instances, args.nodes))
+    ]
+    strings = [url for value in data for url in urls(value)]
+    print("urls:     {} ({} distinct)".format(
+        len(strings), len(set(strings))
+    ))
+
+    uncached = parseTime(strings, dson.utils.URL.parse)
+    urlParse.cache_clear()
+    cached = parseTime(strings, dson.utils.URL)
+    print("parse:    {:.3f}s uncached, {:.3f}s cached ({:.1f}x)".format(
+        uncached, cached, uncached / cached
+    ))
+
+    # resolve the references of the loaded scene again
+    dson.reader.SearchPath.append(root)
+    cache = dson.reader.cache = dson.reader.Cache(prefetch=0)
+    cache.loadURL('/Scenes/benchmark.duf')
+    refs = references(cache)
+    uncached = resolveTime(refs, dson.utils.URL.parse)
+    cached = resolveTime(refs, urlParse)
+    print("resolve:  {} refs".format(len(refs)))
+    print("  uncached {:.3f}s first, {:.3f}s best".format(*uncached))
+    print("  cached   {:.3f}s first, {:.3f}s best".format(*cached))
+    print("cache:    {}".format(urlParse.cache_info()))
+    pass
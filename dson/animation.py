@@ -0,0 +1,188 @@
+from .arrays import numpy, numpyRequire
+from . import types
+from . import utils
+
+# Scene animations are lists of keys per channel:
+#
+#   {"url": "name://@selection#lThighBend:?rotation/x/value",
+#    "keys": [[time, value, [interpolation, ...]], ...]}
+#
+# interpolation is ["constant"], ["linear"] (the default),
+# ["hermite", in_tangent, out_tangent] or ["tcb", tension, continuity,
+# bias], and applies to the segment starting at its key.
+
+CONSTANT = 0
+LINEAR = 1
+HERMITE = 2
+TCB = 3
+
+INTERPOLATIONS = {
+    'constant': CONSTANT,
+    'linear': LINEAR,
+    'hermite': HERMITE,
+    'tcb': TCB
+}
+
+def keysGet(keys):
+    # sorted times, values, interpolation modes and parameters
+    keys = sorted(keys, key=lambda key: key[0])
+    count = len(keys)
+    times = numpy.empty(count)
+    values = numpy.empty(count)
+    modes = numpy.full(count, LINEAR, dtype=numpy.int8)
+    params = numpy.zeros((count, 3))
+    for i, key in enumerate(keys):
+        times[i] = key[0]
+        values[i] = key[1]
+        if len(key) > 2 and key[2]:
+            interpolation = key[2]
+            modes[i] = INTERPOLATIONS.get(interpolation[0], LINEAR)
+            extra = interpolation[1:4]
+            params[i, :len(extra)] = extra
+            pass
+        pass
+    return times, values, modes, params
+
+def targetFind(scene, url):
+    # the channel of a scene node a ChannelAnimation url refers to
+    if not isinstance(url, utils.URL):
+        url = utils.URL(url)
+        pass
+    target = None
+    if url.fragment:
+        target = scene.idFind(url.fragment)
+        if target is None:
+            for node in scene.get('nodes', ()):
+                if node.get('name') == url.fragment:
+                    target = node
+                    break
+                pass
+            pass
+        pass
+    if target is None or not url.propPath:
+        return None
+    channel = types.pathFind(target, url.propPath)
+    if not isinstance(channel, types.Channel) and len(url.propPath) > 1:
+        # "rotation/x/value" is the value of the x channel
+        channel = types.pathFind(target, url.propPath[:-1])
+        pass
+    return channel
+
+class AnimationSampler:
+    """samples the ChannelAnimations of a scene
+
+    The keys of all channels are concatenated into flat arrays with
+    each channel's times shifted into its own range, so sample() finds
+    the segments of every (time, channel) pair with a single
+    searchsorted and interpolates them together.
+    """
+
+    def __init__(self, scene):
+        numpyRequire()
+        if isinstance(scene, types.DAZ):
+            scene = scene.get('scene')
+            pass
+        self.animations = []
+        self.channels = []
+        keys = []
+        for animation in (scene.get('animations', ()) if scene else ()):
+            channel = animation.channelGet()
+            animKeys = animation.get('keys')
+            if not animKeys:
+                continue
+            if not all(isinstance(key[1], (int, float)) for key in animKeys):
+                print("WARNING: skipping non scalar animation {}".format(
+                    animation.get('url')
+                ))
+                continue
+            self.animations.append(animation)
+            self.channels.append(channel)
+            keys.append(keysGet(animKeys))
+            pass
+        count = len(keys)
+        self.counts = numpy.array([len(k[0]) for k in keys], dtype=numpy.int64)
+        self.starts = numpy.zeros(count, dtype=numpy.int64)
+        if count:
+            numpy.cumsum(self.counts[:-1], out=self.starts[1:])
+            self.times = numpy.concatenate([k[0] for k in keys])
+            self.values = numpy.concatenate([k[1] for k in keys])
+            self.modes = numpy.concatenate([k[2] for k in keys])
+            self.params = numpy.concatenate([k[3] for k in keys])
+        else:
+            self.times = numpy.zeros(0)
+            self.values = numpy.zeros(0)
+            self.modes = numpy.zeros(0, dtype=numpy.int8)
+            self.params = numpy.zeros((0, 3))
+            pass
+        pass
+
+    def sample(self, times):
+        # (frames, channels) values of the animated channels at times
+        times = numpy.asarray(times, dtype=numpy.float64)
+        frames = len(times)
+        count = len(self.counts)
+        if not count or not frames:
+            return numpy.zeros((frames, count))
+        low = min(self.times.min(), times.min())
+        span = max(self.times.max(), times.max()) - low + 1
+        shift = numpy.repeat(numpy.arange(count) * span, self.counts)
+        shifted = self.times - low + shift
+        queries = (times[:, None] - low) + numpy.arange(count)[None] * span
+
+        starts = self.starts[None]
+        last = starts + self.counts[None] - 1
+        # index of the key starting the segment of each query
+        i0 = numpy.searchsorted(shifted, queries, side='right') - 1
+        i0 = numpy.clip(i0, starts, last)
+        i1 = numpy.minimum(i0 + 1, last)
+        ip = numpy.maximum(i0 - 1, starts)
+        i2 = numpy.minimum(i1 + 1, last)
+
+        t0 = self.times[i0]
+        t1 = self.times[i1]
+        v0 = self.values[i0]
+        v1 = self.values[i1]
+        width = t1 - t0
+        t = numpy.where(width > 0,
+                        (times[:, None] - t0) / numpy.where(width > 0, width, 1),
+                        0)
+        t = numpy.clip(t, 0, 1)
+
+        mode = self.modes[i0]
+        params = self.params[i0]
+        t2 = t * t
+        t3 = t2 * t
+        h00 = 2 * t3 - 3 * t2 + 1
+        h01 = -2 * t3 + 3 * t2
+        h10 = t3 - 2 * t2 + t
+        h11 = t3 - t2
+        # hermite: the out tangent of the first key and the in tangent of
+        # the second key, as slopes
+        d0 = params[..., 1] * width
+        d1 = self.params[i1][..., 0] * width
+        hermite = h00 * v0 + h10 * d0 + h01 * v1 + h11 * d1
+        # tcb: Kochanek-Bartels tangents from the neighbouring keys
+        T = params[..., 0]
+        C = params[..., 1]
+        B = params[..., 2]
+        a0 = (1 - T) * (1 + C) * (1 + B) / 2
+        a1 = (1 - T) * (1 - C) * (1 - B) / 2
+        a2 = (1 - T) * (1 - C) * (1 + B) / 2
+        a3 = (1 - T) * (1 + C) * (1 - B) / 2
+        vp = self.values[ip]
+        v2 = self.values[i2]
+        d0 = a0 * (v0 - vp) + a1 * (v1 - v0)
+        d1 = a2 * (v1 - v0) + a3 * (v2 - v1)
+        tcb = h00 * v0 + h10 * d0 + h01 * v1 + h11 * d1
+
+        result = v0 + t * (v1 - v0)
+        result = numpy.where(mode == CONSTANT, v0, result)
+        result = numpy.where(mode == HERMITE, hermite, result)
+        result = numpy.where(mode == TCB, tcb, result)
+        # hold the first and last values outside the keys
+        before = times[:, None] <= self.times[starts]
+        result = numpy.where(before, self.values[starts], result)
+        after = times[:, None] >= self.times[last]
+        result = numpy.where(after, self.values[last], result)
+        return result
+    pass
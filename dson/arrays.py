@@ -0,0 +1,351 @@
+try:
+    import numpy
+except ImportError:
+    # the array views are unavailable without numpy
+    numpy = None
+
+from . import utils
+
+# NumPy views of the large DSON arrays. The arrays are taken from the
+# memory-mapped sidecar columns when the file has an up to date sidecar
+# (read-only in that case) and built from the loaded lists otherwise.
+
+def numpyRequire():
+    if numpy is None:
+        raise Exception("dson array views require numpy")
+    pass
+
+def values(obj, key):
+    # return the values list of a DSON array property or None
+    prop = obj.get(key)
+    if isinstance(prop, dict):
+        prop = prop.get('values')
+        pass
+    if isinstance(prop, utils.LazyArray):
+        prop = prop.materialize()
+        pass
+    return prop
+
+def column(obj, name, dtype):
+    view = obj.columnGet(name)
+    if view is None:
+        return None
+    return numpy.asarray(view).view(dtype)
+
+def vectorArray(vectors, size, dtype=None):
+    # convert a list of [x, y, ...] lists to a (count, size) array
+    if dtype is None:
+        dtype = numpy.float32
+        pass
+    flat = numpy.fromiter(
+        (x for vector in vectors for x in vector),
+        dtype=dtype,
+        count=len(vectors) * size
+    )
+    return flat.reshape(len(vectors), size)
+
+def polylistArrays(polylist):
+    # split polylist = [[pg, pmg, vertex_index, ...], ...]
+    # into CSR offsets, indices, groups and material groups
+    sizes = numpy.fromiter(map(len, polylist), dtype=numpy.int32,
+                           count=len(polylist))
+    flat = numpy.fromiter(
+        (x for poly in polylist for x in poly),
+        dtype=numpy.int32,
+        count=int(sizes.sum())
+    )
+    starts = numpy.zeros(len(polylist), dtype=numpy.int32)
+    numpy.cumsum(sizes[:-1], out=starts[1:])
+    groups = flat[starts]
+    materialGroups = flat[starts + 1]
+    keep = numpy.ones(len(flat), dtype=bool)
+    keep[starts] = False
+    keep[starts + 1] = False
+    offsets = numpy.zeros(len(polylist) + 1, dtype=numpy.int32)
+    numpy.cumsum(sizes - 2, out=offsets[1:])
+    return offsets, flat[keep], groups, materialGroups
+
+class GeometryArrays:
+    """array view of a Geometry
+
+    vertices               float32 (vertex_count, 3)
+    polygonOffsets         int32 (poly_count + 1) CSR offsets
+    polygonIndices         int32 vertex indices of all polygons
+    polygonGroups          int32 (poly_count) polygon group index
+    polygonMaterialGroups  int32 (poly_count) material group index
+
+    The vertex indices of polygon i are
+    polygonIndices[polygonOffsets[i]:polygonOffsets[i + 1]].
+    """
+
+    def __init__(self, geometry):
+        numpyRequire()
+        self.vertices = column(geometry, 'vertices', numpy.float32)
+        if self.vertices is None:
+            vertices = values(geometry, 'vertices') or []
+            self.vertices = vectorArray(vertices, 3)
+            pass
+        self.polygonOffsets = column(geometry, 'polygon_offsets', numpy.int32)
+        if self.polygonOffsets is not None:
+            self.polygonIndices = column(
+                geometry, 'polygon_indices', numpy.int32
+            )
+            self.polygonGroups = column(
+                geometry, 'polygon_groups', numpy.int32
+            )
+            self.polygonMaterialGroups = column(
+                geometry, 'polygon_material_groups', numpy.int32
+            )
+        else:
+            polylist = values(geometry, 'polylist') or []
+            (self.polygonOffsets, self.polygonIndices,
+             self.polygonGroups, self.polygonMaterialGroups) = \
+                 polylistArrays(polylist)
+            pass
+        pass
+
+    def polygonCount(self):
+        return len(self.polygonOffsets) - 1
+
+    def polygonSizes(self):
+        # number of vertices of each polygon (3 = tri, 4 = quad)
+        return numpy.diff(self.polygonOffsets)
+
+    def polygon(self, index):
+        return self.polygonIndices[
+            self.polygonOffsets[index]:self.polygonOffsets[index + 1]
+        ]
+
+    def groupPolygons(self, group):
+        # indices of the polygons in a polygon group
+        return numpy.flatnonzero(self.polygonGroups == group)
+
+    def materialGroupPolygons(self, group):
+        # indices of the polygons in a material group
+        return numpy.flatnonzero(self.polygonMaterialGroups == group)
+    pass
+
+class UVSetArrays:
+    """array view of a UVSet
+
+    uvs                   float32 (uv_count, 2)
+    polygonVertexIndices  int32 (count, 3) [polygon, vertex, uv index]
+                          rows for the polygon vertices whose uv isn't
+                          the vertex index
+    """
+
+    def __init__(self, uvSet):
+        numpyRequire()
+        self.uvs = column(uvSet, 'uvs', numpy.float32)
+        if self.uvs is None:
+            uvs = values(uvSet, 'uvs') or []
+            self.uvs = vectorArray(uvs, 2)
+            pass
+        self.polygonVertexIndices = column(
+            uvSet, 'polygon_vertex_indices', numpy.int32
+        )
+        if self.polygonVertexIndices is None:
+            pvi = values(uvSet, 'polygon_vertex_indices') or []
+            self.polygonVertexIndices = vectorArray(pvi, 3, numpy.int32)
+            pass
+        pass
+    pass
+
+class MorphArrays:
+    """sparse deltas of a Morph
+
+    indices  int32 (count) vertex indices
+    deltas   float32 (count, 3)
+    """
+
+    def __init__(self, morph):
+        numpyRequire()
+        self.indices = column(morph, 'delta_indices', numpy.int32)
+        if self.indices is not None:
+            self.deltas = column(morph, 'deltas', numpy.float32)
+        else:
+            # deltas = [[vertex_index, x, y, z], ...]
+            deltas = values(morph, 'deltas') or []
+            self.indices = numpy.fromiter(
+                (delta[0] for delta in deltas),
+                dtype=numpy.int32,
+                count=len(deltas)
+            )
+            self.deltas = numpy.fromiter(
+                (x for delta in deltas for x in delta[1:4]),
+                dtype=numpy.float32,
+                count=len(deltas) * 3
+            ).reshape(len(deltas), 3)
+            pass
+        pass
+    pass
+
+def morphGet(modifier):
+    # accept a Morph or a Modifier with a morph, or an instance of one
+    obj = modifier
+    while obj is not None:
+        if 'deltas' in obj:
+            return obj
+        morph = obj.get('morph')
+        if morph is not None:
+            return morph
+        # the morph of the instance's definition
+        obj = obj.instDef
+        pass
+    raise Exception("modifier {} has no morph".format(modifier))
+
+def morphsApply(geometry, morphs, vertices=None):
+    """return the vertices of geometry with weighted morphs applied
+
+    morphs is an iterable of (modifier or Morph, weight) pairs. The
+    deltas of all morphs are accumulated in one pass per axis and added
+    to a copy of vertices (the geometry's vertices by default).
+    """
+    numpyRequire()
+    if vertices is None:
+        vertices = geometry.arrays().vertices
+        pass
+    result = numpy.array(vertices, dtype=numpy.float32)
+    count = len(result)
+    indices = []
+    deltas = []
+    weights = []
+    for modifier, weight in morphs:
+        if not weight:
+            continue
+        view = morphGet(modifier).arrays()
+        if len(view.indices) and int(view.indices.max()) >= count:
+            raise Exception(
+                "morph {} doesn't match the {} vertices of {}".format(
+                    modifier, count, geometry
+                )
+            )
+        indices.append(view.indices)
+        deltas.append(view.deltas)
+        weights.append(numpy.full(len(view.indices), weight,
+                                  dtype=numpy.float32))
+        pass
+    if not indices:
+        return result
+    indices = numpy.concatenate(indices)
+    deltas = numpy.concatenate(deltas) * numpy.concatenate(weights)[:, None]
+    for axis in range(3):
+        result[:, axis] += numpy.bincount(
+            indices, weights=deltas[:, axis], minlength=count
+        )
+        pass
+    return result
+
+class SkinArrays:
+    """sparse vertex by joint weights of a SkinBinding
+
+    jointIds       node id of each joint column
+    vertexIndices  int32 (count) sorted vertex index of each weight
+    jointIndices   int32 (count) joint column of each weight
+    weights        float32 (count)
+    """
+
+    def __init__(self, binding):
+        numpyRequire()
+        self.vertexCount = binding.get('vertex_count')
+        self.jointIds = []
+        vertexIndices = []
+        jointIndices = []
+        weights = []
+        for joint in binding.get('joints', ()):
+            # node_weights = [[vertex_index, weight], ...]
+            nodeWeights = values(joint, 'node_weights') or []
+            column = len(self.jointIds)
+            self.jointIds.append(jointId(joint))
+            vertexIndices.append(numpy.fromiter(
+                (rec[0] for rec in nodeWeights),
+                dtype=numpy.int32,
+                count=len(nodeWeights)
+            ))
+            weights.append(numpy.fromiter(
+                (rec[1] for rec in nodeWeights),
+                dtype=numpy.float32,
+                count=len(nodeWeights)
+            ))
+            jointIndices.append(
+                numpy.full(len(nodeWeights), column, dtype=numpy.int32)
+            )
+            pass
+        if vertexIndices:
+            vertexIndices = numpy.concatenate(vertexIndices)
+            order = numpy.argsort(vertexIndices, kind='stable')
+            self.vertexIndices = vertexIndices[order]
+            self.jointIndices = numpy.concatenate(jointIndices)[order]
+            self.weights = numpy.concatenate(weights)[order]
+        else:
+            self.vertexIndices = numpy.zeros(0, dtype=numpy.int32)
+            self.jointIndices = numpy.zeros(0, dtype=numpy.int32)
+            self.weights = numpy.zeros(0, dtype=numpy.float32)
+            pass
+        # the weighted vertices and where their weights start
+        self.vertices, self.starts = numpy.unique(
+            self.vertexIndices, return_index=True
+        )
+        pass
+
+    def dense(self):
+        # (vertex_count, joint_count) weight matrix
+        count = self.vertexCount
+        if count is None:
+            count = int(self.vertexIndices.max()) + 1 if len(self.weights) else 0
+            pass
+        matrix = numpy.zeros((count, len(self.jointIds)), dtype=numpy.float32)
+        numpy.add.at(matrix, (self.vertexIndices, self.jointIndices),
+                     self.weights)
+        return matrix
+    pass
+
+def jointId(joint):
+    # the node id of a WeightedJoint
+    node = joint.get('node')
+    # a Ref or the url string
+    url = getattr(node, 'url', node)
+    if isinstance(url, str):
+        return utils.URL(url).fragment
+    return joint.get('id')
+
+def skin(binding, transforms, vertices):
+    """linear blend skinning
+
+    transforms are the skinning matrices (pose world transform times the
+    inverse bind world transform) of the binding's joints in jointIds
+    order, either (joint_count, 4, 4) for one pose or
+    (pose_count, joint_count, 4, 4) for a batch. The matrices transform
+    column vectors. vertices are the (vertex_count, 3) rest positions.
+    Returns (vertex_count, 3) or (pose_count, vertex_count, 3); vertices
+    without weights keep their rest position.
+    """
+    numpyRequire()
+    view = binding.arrays()
+    transforms = numpy.asarray(transforms, dtype=numpy.float32)
+    single = transforms.ndim == 3
+    if single:
+        transforms = transforms[None]
+        pass
+    if transforms.shape[1:] != (len(view.jointIds), 4, 4):
+        raise Exception(
+            "expected {} joint transforms for {}, got shape {}".format(
+                len(view.jointIds), binding, transforms.shape
+            )
+        )
+    vertices = numpy.asarray(vertices, dtype=numpy.float32)
+    result = numpy.repeat(vertices[None], len(transforms), axis=0)
+    if len(view.vertices):
+        # blend the 3x4 matrices of each weighted vertex
+        weighted = (transforms[:, view.jointIndices, :3, :] *
+                    view.weights[None, :, None, None])
+        blended = numpy.add.reduceat(weighted, view.starts, axis=1)
+        rest = vertices[view.vertices]
+        result[:, view.vertices] = (
+            numpy.einsum('pvij,vj->pvi', blended[..., :3], rest) +
+            blended[..., 3]
+        )
+        pass
+    if single:
+        return result[0]
+    return result
@@ -0,0 +1,368 @@
+import collections
+import heapq
+
+from . import reader
+from . import types
+from . import utils
+
+# Formulas compute a property from other properties with a stack machine:
+#
+#   {"output": "lThighBend:#lThighBend?rotation/x/value",
+#    "stage": "sum",
+#    "operations": [
+#        {"op": "push", "url": "CTRLSit:#CTRLSit?value"},
+#        {"op": "push", "val": [0, 0]},
+#        {"op": "push", "val": [1, -90]},
+#        {"op": "push", "val": 2},
+#        {"op": "spline_linear"}]}
+#
+# add, sub, mult and div pop the top of the stack as the right operand,
+# the splines pop the knot count, the knots and the input value.
+# The value of a property is (value + sum stage outputs) * mult stage
+# outputs, clamped to the channel's min/max when it is clamped.
+
+# instruction codes
+PUSH = 0
+LOAD = 1
+ADD = 2
+SUB = 3
+MULT = 4
+DIV = 5
+SPLINE_CONSTANT = 6
+SPLINE_LINEAR = 7
+SPLINE_TCB = 8
+
+OPCODES = {
+    'add': ADD,
+    'sub': SUB,
+    'mult': MULT,
+    'div': DIV,
+    'spline_constant': SPLINE_CONSTANT,
+    'spline_linear': SPLINE_LINEAR,
+    'spline_tcb': SPLINE_TCB
+}
+
+STAGE_SUM = 'sum'
+STAGE_MULT = 'mult'
+
+def splineConstant(x, knots):
+    value = knots[0][1]
+    for knot in knots:
+        if x < knot[0]:
+            break
+        value = knot[1]
+        pass
+    return value
+
+def splineLinear(x, knots):
+    if x <= knots[0][0]:
+        return knots[0][1]
+    for k0, k1 in zip(knots, knots[1:]):
+        if x <= k1[0]:
+            t = (x - k0[0]) / (k1[0] - k0[0])
+            return k0[1] + t * (k1[1] - k0[1])
+        pass
+    return knots[-1][1]
+
+def splineTCB(x, knots):
+    # Kochanek-Bartels spline, see utils.spline_tcb in www/html/js/utils.js
+    n = len(knots)
+    if x <= knots[0][0]:
+        return knots[0][1]
+    if x >= knots[-1][0]:
+        return knots[-1][1]
+    for i in range(1, n):
+        k1 = knots[i]
+        if x <= k1[0]:
+            break
+        pass
+    kp = knots[max(0, i - 2)]
+    k0 = knots[i - 1]
+    kn = knots[min(n - 1, i + 1)]
+    t = (x - k0[0]) / (k1[0] - k0[0])
+    T, C, B = (list(k0[2:5]) + [0, 0, 0])[:3]
+    a0 = (1 - T) * (1 + C) * (1 + B) / 2
+    a1 = (1 - T) * (1 - C) * (1 - B) / 2
+    a2 = (1 - T) * (1 - C) * (1 + B) / 2
+    a3 = (1 - T) * (1 + C) * (1 - B) / 2
+    d0 = [a0 * (k0[j] - kp[j]) + a1 * (k1[j] - k0[j]) for j in (0, 1)]
+    d1 = [a2 * (k1[j] - k0[j]) + a3 * (kn[j] - k1[j]) for j in (0, 1)]
+    t2 = t * t
+    t3 = t2 * t
+    h00 = 2 * t3 - 3 * t2 + 1
+    h01 = -2 * t3 + 3 * t2
+    h10 = t3 - 2 * t2 + t
+    h11 = t3 - t2
+    return h00 * k0[1] + h10 * d0[1] + h01 * k1[1] + h11 * d1[1]
+
+SPLINES = {
+    SPLINE_CONSTANT: splineConstant,
+    SPLINE_LINEAR: splineLinear,
+    SPLINE_TCB: splineTCB
+}
+
+def execute(code, values):
+    stack = []
+    for op, arg in code:
+        if op == PUSH:
+            stack.append(arg)
+        elif op == LOAD:
+            stack.append(values[arg])
+        elif op in SPLINES:
+            count = int(stack.pop())
+            knots = stack[-count:]
+            del stack[-count:]
+            stack[-1] = SPLINES[op](stack[-1], knots)
+        else:
+            b = stack.pop()
+            a = stack[-1]
+            if op == ADD:
+                stack[-1] = a + b
+            elif op == SUB:
+                stack[-1] = a - b
+            elif op == MULT:
+                stack[-1] = a * b
+            elif b:
+                stack[-1] = a / b
+            else:
+                stack[-1] = 0
+                pass
+            pass
+        pass
+    return stack[-1]
+
+def channelValue(value):
+    if isinstance(value, types.Channel):
+        if 'current_value' in value:
+            return value['current_value']
+        return value.get('value', 0)
+    if isinstance(value, (int, float)):
+        return value
+    return 0
+
+class FormulaEngine:
+    """compiled evaluation of the formulas below a set of objects
+
+    Properties are identified by keys "file_path#asset_id?property_path".
+    The formulas are ordered by their dependencies and compiled into
+    instruction lists. set() changes an input property and update()
+    re-evaluates the properties downstream of the changed ones.
+    """
+
+    def __init__(self, roots):
+        if isinstance(roots, types.Object):
+            roots = [roots]
+            pass
+        # property values by slot
+        self.keys = []
+        self.slots = {}
+        self.values = []
+        self.defaults = []
+        self.limits = []
+        # user set values by slot
+        self.inputs = {}
+        # formulas by output slot: [(stage, code), ...]
+        self.formulas = collections.defaultdict(list)
+        # slots computed from each slot
+        self.dependents = collections.defaultdict(set)
+        for root in roots:
+            for formula in types.forEach(
+                    root, pred=lambda obj: isinstance(obj, types.Formula)):
+                self.formulaAdd(formula)
+                pass
+            pass
+        self.order = self.sort()
+        # position of each computed slot in the evaluation order
+        self.position = {slot: i for i, slot in enumerate(self.order)}
+        self.dirty = set(self.order)
+        self.update()
+        pass
+
+    def keyGet(self, obj, url):
+        if not isinstance(url, utils.URL):
+            url = utils.URL(url)
+            pass
+        path = url.path or obj.rootGet().path or ''
+        return "{}#{}?{}".format(
+            path, url.fragment, "/".join(url.propPath or ())
+        )
+
+    def slotGet(self, obj, url):
+        key = self.keyGet(obj, url)
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self.slots[key] = len(self.keys)
+            self.keys.append(key)
+            channel = self.channelFind(obj, url)
+            value = channelValue(channel)
+            limits = None
+            if isinstance(channel, types.Channel) and channel.get('clamped'):
+                limits = (channel.get('min'), channel.get('max'))
+                pass
+            self.values.append(value)
+            self.defaults.append(value)
+            self.limits.append(limits)
+            pass
+        return slot
+
+    def channelFind(self, obj, url):
+        # the channel (or value) a url refers to or None
+        if not isinstance(url, utils.URL):
+            url = utils.URL(url)
+            pass
+        try:
+            if url.path:
+                target = reader.cache.loadURL(
+                    "{}#{}".format(url.path, url.fragment)
+                )
+            else:
+                target = obj.idFind(url.fragment)
+                pass
+        except Exception as e:
+            print("WARNING: can't resolve formula url {}: {}".format(url, e))
+            return None
+        if target is None or not url.propPath:
+            return None
+        channel = types.pathFind(target, url.propPath)
+        if not isinstance(channel, types.Channel) and len(url.propPath) > 1:
+            # "rotation/x/value" is the value of the x channel, as in
+            # animation.targetFind
+            channel = types.pathFind(target, url.propPath[:-1])
+            pass
+        return channel
+
+    def formulaAdd(self, formula):
+        output = formula.get('output')
+        if output is None:
+            return
+        slot = self.slotGet(formula, output)
+        code = []
+        for operation in formula.get('operations', ()):
+            op = operation.get('op')
+            if op == 'push':
+                if 'url' in operation:
+                    source = self.slotGet(formula, operation['url'])
+                    self.dependents[source].add(slot)
+                    code.append((LOAD, source))
+                else:
+                    code.append((PUSH, operation.get('val')))
+                    pass
+            elif op in OPCODES:
+                code.append((OPCODES[op], None))
+            else:
+                print("WARNING: unknown formula operation {} in {}".format(
+                    op, formula.treePath()
+                ))
+                return
+            pass
+        stage = formula.get('stage') or STAGE_SUM
+        self.formulas[slot].append((stage, tuple(code)))
+        pass
+
+    def sort(self):
+        # order the computed slots after the slots they read
+        indegree = {slot: 0 for slot in self.formulas}
+        for source, targets in self.dependents.items():
+            for target in targets:
+                indegree[target] += 1
+                pass
+            pass
+        ready = collections.deque(
+            slot for slot in range(len(self.keys)) if not indegree.get(slot)
+        )
+        order = []
+        while ready:
+            slot = ready.popleft()
+            if slot in self.formulas:
+                order.append(slot)
+                pass
+            for target in sorted(self.dependents.get(slot, ())):
+                indegree[target] -= 1
+                if not indegree[target]:
+                    ready.append(target)
+                    pass
+                pass
+            pass
+        if len(order) != len(self.formulas):
+            cycle = [self.keys[slot] for slot, count in indegree.items()
+                     if count]
+            raise Exception("formula cycle between {}".format(cycle))
+        return order
+
+    def get(self, key):
+        return self.values[self.slots[key]]
+
+    def set(self, key, value):
+        slot = self.slots[key]
+        self.inputs[slot] = value
+        if slot in self.formulas:
+            self.dirty.add(slot)
+        else:
+            self.values[slot] = value
+            self.dirty.update(self.dependents.get(slot, ()))
+            pass
+        pass
+
+    def reset(self, key):
+        # drop the user set value of key
+        slot = self.slots[key]
+        self.inputs.pop(slot, None)
+        if slot not in self.formulas:
+            self.values[slot] = self.defaults[slot]
+            pass
+        self.dirty.add(slot)
+        self.dirty.update(self.dependents.get(slot, ()))
+        pass
+
+    def evaluate(self, slot):
+        values = self.values
+        total = self.inputs.get(slot, self.defaults[slot])
+        scale = 1
+        for stage, code in self.formulas[slot]:
+            value = execute(code, values)
+            if stage == STAGE_MULT:
+                scale *= value
+            else:
+                total += value
+                pass
+            pass
+        total *= scale
+        limits = self.limits[slot]
+        if limits is not None:
+            low, high = limits
+            if high is not None and total > high:
+                total = high
+                pass
+            if low is not None and total < low:
+                total = low
+                pass
+            pass
+        return total
+
+    def update(self):
+        # re-evaluate the dirty slots and their dependents in order,
+        # returns the keys whose values changed
+        changed = []
+        pending = [self.position[slot] for slot in self.dirty
+                   if slot in self.position]
+        heapq.heapify(pending)
+        self.dirty = set()
+        queued = set(pending)
+        while pending:
+            position = heapq.heappop(pending)
+            slot = self.order[position]
+            value = self.evaluate(slot)
+            if value == self.values[slot]:
+                continue
+            self.values[slot] = value
+            changed.append(self.keys[slot])
+            for target in self.dependents.get(slot, ()):
+                targetPosition = self.position[target]
+                if targetPosition not in queued:
+                    queued.add(targetPosition)
+                    heapq.heappush(pending, targetPosition)
+                    pass
+                pass
+            pass
+        return changed
+    pass
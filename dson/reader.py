@@ -1,8 +1,18 @@
-import codecs
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
 import gzip
+import hashlib
+import hmac
 import json
 import os
+import pickle
+import re
 import sys
+import threading
+import zlib
 
 from . import utils
 from . import types
@@ -29,57 +39,1071 @@ def isGzipped(path):
         pass
     return False
 
-class Cache:
+class Decoder:
+    # a file container format recognized by its leading magic bytes
+    def __init__(self, name, magic, decompress):
+        self.name = name
+        self.magic = magic
+        self.decompress = decompress
+        pass
+    pass
+
+# registered file container formats
+Decoders = []
+
+def decoderRegister(name, magic, decompress):
+    decoder = Decoder(name, magic, decompress)
+    Decoders.append(decoder)
+    return decoder
+
+def decoderGet(raw):
+    for decoder in Decoders:
+        if raw.startswith(decoder.magic):
+            return decoder
+        pass
+    return None
+
+def gunzip(raw):
+    # decompress in a single zlib call
+    d = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    data = d.decompress(raw)
+    if d.unused_data:
+        # multi-member gzip file
+        return gzip.decompress(raw)
+    return data
+
+decoderRegister('gzip', GZIP_MAGIC, gunzip)
+
+# large number arrays that can be left undecoded until they are accessed
+LAZY_ARRAY_RE = re.compile(
+    rb'"(?:vertices|polylist|deltas|uvs|node_weights)"\s*:\s*\{\s*'
+    rb'(?:"count"\s*:\s*\d+\s*,\s*)?"values"\s*:\s*(?=\[)'
+)
+
+# an array of numbers or of arrays of numbers
+NUMBER_ARRAY_RE = re.compile(
+    rb'\[(?:[^\[\]"]*\[[^\[\]"]*\])*[^\[\]"]*\]'
+)
+
+# arrays smaller than this are decoded immediately
+LAZY_ARRAY_MIN = 4096
+
+def lazyLoads(raw):
+    # Cut the lazy arrays out of the JSON text and replace them with
+    # -Infinity, which the decoder hands to parse_constant in document
+    # order. DSON files are plain JSON so never contain -Infinity.
+    arrays = []
+    parts = []
+    pos = 0
+    for m in LAZY_ARRAY_RE.finditer(raw):
+        start = m.end()
+        if start < pos:
+            continue
+        array = NUMBER_ARRAY_RE.match(raw, start)
+        if array is None or array.end() - start < LAZY_ARRAY_MIN:
+            continue
+        parts.append(raw[pos:start])
+        parts.append(b'-Infinity')
+        arrays.append(array.group())
+        pos = array.end()
+        pass
+    if not arrays:
+        return json.loads(raw)
+    parts.append(raw[pos:])
+    arrays.reverse()
+
+    def lazyArray(name):
+        if name != '-Infinity':
+            raise ValueError("invalid JSON constant {}".format(name))
+        return utils.LazyArray(arrays.pop())
+
+    return json.loads(b''.join(parts), parse_constant=lazyArray)
+
+# the top-level properties kept by each load profile, from the least to
+# the most complete; each profile includes the ones before it
+PROFILES = collections.OrderedDict([
+    ('info', ('file_version', 'asset_info')),
+    ('nodes', ('file_version', 'asset_info', 'node_library')),
+    ('geometry', ('file_version', 'asset_info', 'node_library',
+                  'geometry_library', 'uv_set_library')),
+    ('full', None)
+])
+
+PROFILE_FULL = 'full'
+
+def profileCheck(profile):
+    if profile not in PROFILES:
+        raise Exception("unknown load profile {}, expected one of {}".format(
+            profile, list(PROFILES)
+        ))
+    pass
+
+def profileIncludes(profile, other):
+    # True if a file loaded with profile has the properties of other
+    order = list(PROFILES)
+    return order.index(profile) >= order.index(other)
+
+# the top-level DSON properties
+TOP_LEVEL_NAMES = (
+    'file_version', 'asset_info', 'geometry_library', 'node_library',
+    'uv_set_library', 'modifier_library', 'image_library',
+    'material_library', 'scene'
+)
+
+COLON_RE = re.compile(rb'\s*:')
+
+def isBalanced(raw, start, end):
+    return (raw.count(b'{', start, end) == raw.count(b'}', start, end) and
+            raw.count(b'[', start, end) == raw.count(b']', start, end))
+
+def topLevelFind(raw):
+    # sorted (separator position, name, value position) of the property
+    # names in raw that follow a '{' or ','
+    found = []
+    for name in TOP_LEVEL_NAMES:
+        quoted = '"{}"'.format(name).encode('ascii')
+        pos = raw.find(quoted)
+        while pos >= 0:
+            sep = pos - 1
+            while sep >= 0 and raw[sep] in b' \t\r\n':
+                sep -= 1
+                pass
+            colon = COLON_RE.match(raw, pos + len(quoted))
+            if sep >= 0 and raw[sep] in b'{,' and colon:
+                found.append((sep, name, colon.end()))
+                pass
+            pos = raw.find(quoted, pos + len(quoted))
+            pass
+        pass
+    found.sort()
+    return found
+
+def profileCut(raw, keys):
+    # Cut the top-level properties that are not in keys out of the JSON
+    # text so they are never decoded. Returns None if the text can't be
+    # split at its top-level properties (eg, a nested property with a
+    # top-level name), the caller decodes the whole text then.
+    found = topLevelFind(raw)
+    if not found or raw[:found[0][0]].strip():
+        return None
+    end = raw.rfind(b'}')
+    parts = []
+    for i, (sep, name, start) in enumerate(found):
+        valueEnd = found[i + 1][0] if i + 1 < len(found) else end
+        if not isBalanced(raw, start, valueEnd):
+            return None
+        if name in keys:
+            parts.append(raw[sep + 1:valueEnd])
+            pass
+        pass
+    return b'{' + b','.join(parts) + b'}'
+
+class FileIndex:
+    """index of the files under the search path directories
+
+    The index is built on the first lookup and rebuilt after refresh().
+    Lookups, including misses, are remembered so each path is resolved
+    at most once.
+    """
+
+    def __init__(self, roots=None, caseInsensitive=False):
+        # None means use SearchPath
+        self.roots = roots
+        # match paths ignoring case, eg for libraries copied from Windows
+        self.caseInsensitive = caseInsensitive
+        self.files = None
+        self.located = {}
+        pass
+
+    def refresh(self):
+        self.files = None
+        self.located = {}
+        pass
+
+    def keyGet(self, path):
+        key = re.sub(r'/+', '/', path)
+        if self.caseInsensitive:
+            key = key.lower()
+            pass
+        return key
+
+    def build(self):
+        files = {}
+        roots = SearchPath if self.roots is None else self.roots
+        for root in roots:
+            # without a trailing separator, so relDir starts with one
+            root = os.path.normpath(root)
+            if utils.verbose:
+                print("indexing directory \"{}\"...".format(root))
+                pass
+            for dirPath, dirNames, fileNames in os.walk(root):
+                relDir = dirPath[len(root):].replace('\\', '/')
+                for name in fileNames:
+                    key = self.keyGet(relDir + '/' + name)
+                    if key not in files:
+                        # earlier search path directories take precedence
+                        files[key] = root + relDir + '/' + name
+                        pass
+                    pass
+                pass
+            pass
+        self.files = files
+        pass
+
+    def locate(self, path):
+        if path in self.located:
+            return self.located[path]
+        if os.path.exists(path):
+            found = path
+        else:
+            if self.files is None:
+                self.build()
+                pass
+            found = self.files.get(self.keyGet(path))
+            pass
+        self.located[path] = found
+        return found
+    pass
+
+# keys of the files loaded by the current loadURLAsync task
+asyncLoading = contextvars.ContextVar('asyncLoading', default=())
+
+# default number of files that are read concurrently when prefetching
+PREFETCH_WORKERS = 4
+
+# default size limit for the persistent parsed file cache
+DISK_CACHE_SIZE = 2 * 1024 * 1024 * 1024
+
+class DiskCache:
+    """persistent cache of parsed DSON files
+
+    Entries are keyed by the resolved file path, size and modification
+    time so a changed file is never served stale. The least recently
+    used entries are evicted when the total size exceeds maxSize.
+
+    Entries are pickles, so loading one can run arbitrary code. Each is
+    signed with an HMAC of its key and data using the secret in the
+    KEY_FILE of the directory, which only the current user may own and
+    read, and entries with a wrong signature are discarded. Still only
+    use a directory that other users cannot write to.
+    """
+
+    # bump to invalidate entries written by older versions
+    VERSION = 2
+
+    ENTRY_EXT = '.pickle'
+
+    KEY_FILE = 'secret.key'
+
+    def __init__(self, path=None, maxSize=DISK_CACHE_SIZE):
+        if path is None:
+            path = os.environ.get('DSON_CACHE_DIR')
+            pass
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.cache', 'dson')
+            pass
+        self.path = path
+        self.maxSize = maxSize
+        self.size = None
+        # HMAC key of the entries, see secretGet
+        self.secret = None
+        pass
+
+    def keyGet(self, path, variant=''):
+        # (entry key, the source file identity it is signed with)
+        stat = os.stat(path)
+        key = "{}|{}|{}|{}|{}".format(
+            os.path.abspath(path),
+            stat.st_size,
+            stat.st_mtime_ns,
+            variant,
+            self.VERSION
+        ).encode('utf-8')
+        return hashlib.sha1(key).hexdigest(), key
+
+    def entryPath(self, key):
+        return os.path.join(self.path, key[:2], key + self.ENTRY_EXT)
+
+    def secretGet(self):
+        # read or create the HMAC key of this cache directory
+        if self.secret is not None:
+            return self.secret
+        keyPath = os.path.join(self.path, self.KEY_FILE)
+        os.makedirs(self.path, exist_ok=True)
+        try:
+            fd = os.open(keyPath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            fd = None
+            pass
+        if fd is not None:
+            with os.fdopen(fd, 'wb') as wb:
+                wb.write(os.urandom(32))
+                pass
+            pass
+        with open(keyPath, 'rb') as rb:
+            stat = os.fstat(rb.fileno())
+            if hasattr(os, 'getuid') and (
+                    stat.st_uid != os.getuid() or stat.st_mode & 0o077):
+                raise Exception(
+                    "cache key \"{}\" must be private to the user".format(
+                        keyPath
+                    )
+                )
+            secret = rb.read()
+            pass
+        if len(secret) < 32:
+            raise Exception("invalid cache key \"{}\"".format(keyPath))
+        self.secret = secret
+        return secret
+
+    def sign(self, key, payload):
+        return hmac.new(self.secretGet(), key + b'|' + payload,
+                        hashlib.sha256).digest()
+
+    def get(self, path, variant=''):
+        key, signed = self.keyGet(path, variant)
+        entryPath = self.entryPath(key)
+        # an unusable key is an error rather than an invalid entry
+        self.secretGet()
+        try:
+            with open(entryPath, 'rb') as rb:
+                entry = rb.read()
+                pass
+            digest = entry[:hashlib.sha256().digest_size]
+            payload = entry[len(digest):]
+            if not hmac.compare_digest(digest, self.sign(signed, payload)):
+                raise Exception("bad signature")
+            data = pickle.loads(payload)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            print("WARNING: discarding invalid cache entry \"{}\" for \"{}\"".format(
+                entryPath, path
+            ))
+            self.remove(entryPath)
+            return None
+        # mark the entry as recently used
+        os.utime(entryPath)
+        if utils.verbose:
+            print("loaded file \"{}\" from cache".format(path))
+            pass
+        return data
+
+    def put(self, path, data, variant=''):
+        key, signed = self.keyGet(path, variant)
+        entryPath = self.entryPath(key)
+        os.makedirs(os.path.dirname(entryPath), exist_ok=True)
+        tmpPath = "{}.{}.{}.tmp".format(
+            entryPath, os.getpid(), threading.get_ident()
+        )
+        payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(tmpPath, 'wb') as wb:
+            wb.write(self.sign(signed, payload))
+            wb.write(payload)
+            pass
+        os.replace(tmpPath, entryPath)
+        if self.size is not None:
+            self.size += os.path.getsize(entryPath)
+            pass
+        self.evict()
+        pass
+
+    def entries(self):
+        if not os.path.isdir(self.path):
+            return
+        for dirPath, dirNames, fileNames in os.walk(self.path):
+            for name in fileNames:
+                if name.endswith(self.ENTRY_EXT):
+                    entryPath = os.path.join(dirPath, name)
+                    try:
+                        stat = os.stat(entryPath)
+                    except FileNotFoundError:
+                        continue
+                    yield entryPath, stat
+                    pass
+                pass
+            pass
+        pass
+
+    def evict(self):
+        if self.maxSize is None:
+            return
+        if self.size is not None and self.size <= self.maxSize:
+            return
+        entries = sorted(self.entries(), key=lambda e: e[1].st_mtime)
+        self.size = sum(stat.st_size for entryPath, stat in entries)
+        for entryPath, stat in entries:
+            if self.size <= self.maxSize:
+                break
+            if utils.verbose:
+                print("evicting cache entry \"{}\"".format(entryPath))
+                pass
+            self.remove(entryPath)
+            self.size -= stat.st_size
+            pass
+        pass
+
+    def remove(self, entryPath):
+        try:
+            os.remove(entryPath)
+        except FileNotFoundError:
+            pass
+        pass
+
+    def clear(self):
+        for entryPath, stat in list(self.entries()):
+            self.remove(entryPath)
+            pass
+        self.size = 0
+        pass
+    pass
+
+class InFlight:
+    # a file that is being loaded by a thread
     def __init__(self):
-        self.cache = {}
+        self.thread = threading.get_ident()
+        self.event = threading.Event()
+        self.obj = None
+        self.error = None
+        pass
+    pass
+
+class Cache:
+    def __init__(self, diskCache=None, memoryLimit=None, lazyArrays=False,
+                 prefetch=PREFETCH_WORKERS, fileIndex=None, sidecars=None,
+                 lazyLibraries=False, lazyRefs=False):
+        # loaded files in least recently used order
+        self.cache = collections.OrderedDict()
+        self.diskCache = diskCache
+        # optional FileIndex used to resolve file paths
+        self.fileIndex = fileIndex
+        # if True, large vertex, polygon, uv, morph and weight arrays
+        # are decoded on first access
+        self.lazyArrays = lazyArrays
+        # if True, library entries are constructed when they are accessed
+        # (see types.LibraryList)
+        self.lazyLibraries = lazyLibraries
+        # if True, references are resolved when they are accessed
+        # (see types.Ref) and the files they refer to are loaded then
+        self.lazyRefs = lazyRefs
+        # optional SidecarStore providing binary columns for loaded files
+        self.sidecars = sidecars
+        # approximate memory budget in bytes for the loaded files
+        self.memoryLimit = memoryLimit
+        # approximate resident bytes per loaded file
+        self.sizes = {}
+        # sum of the sizes of the files in cache, None until evict
+        # needs it
+        self.residentTotal = None
+        # files referenced by each loaded or loading file
+        self.deps = {}
+        # the reverse of deps, the files referenced by another loaded or
+        # loading file are pinned in cache
+        self.pins = {}
+        # number of loads resolving references of each file, which pin
+        # the file in cache
+        self.active = collections.Counter()
+        # load profile of each loaded file, see PROFILES
+        self.profiles = {}
+        # serializes adding the properties of richer profiles to files
+        self.upgradeLock = threading.RLock()
+        # maximum number of referenced files read concurrently
+        # before resolving references (0 disables prefetching)
+        self.prefetch = prefetch
+        # parsed data of prefetched files that are not loaded yet
+        self.prefetched = {}
+        # futures of the files being loaded by loadURLAsync
+        self.pending = {}
+        # the files each loadURLAsync task is waiting for:
+        # key -> Counter(awaited keys)
+        self.asyncWaits = {}
+        # guards the cache state shared between threads
+        self.lock = threading.RLock()
+        # files being loaded, which are only visible to the loading thread
+        # until their references are resolved
+        self.inflight = {}
+        # the file each thread is waiting for
+        self.waiting = {}
+        # per thread stack of files whose references are being resolved
+        self.local = threading.local()
         pass
 
-    def loadURL(self, url):
+    @property
+    def loading(self):
+        loading = getattr(self.local, 'loading', None)
+        if loading is None:
+            loading = self.local.loading = []
+            pass
+        return loading
+
+    @property
+    def loadingProfiles(self):
+        # the profile each file in loading is being loaded with, or None
+        # for the profile it was loaded with
+        profiles = getattr(self.local, 'profiles', None)
+        if profiles is None:
+            profiles = self.local.profiles = []
+            pass
+        return profiles
+
+    def loadURL(self, url, profile=None):
+        """load the file of url and return the object url refers to
+
+        profile selects the top-level properties that are loaded (see
+        PROFILES); by default the files referenced while resolving a file
+        get its profile and other files are loaded in full. A loaded file
+        is upgraded in place when a richer profile is requested.
+        """
         if not isinstance(url, utils.URL):
             url = utils.URL(url)
             pass
         key = url.path
 
         obj = None
-        if key in self.cache:
-            obj = self.cache[key]
+        flight = None
+        isOwner = False
+        with self.lock:
+            loading = self.loading
+            if profile is None:
+                profile = PROFILE_FULL
+                if loading:
+                    profile = (self.loadingProfiles[-1] or
+                               self.profiles.get(loading[-1], PROFILE_FULL))
+                    pass
+                pass
+            profileCheck(profile)
+            if loading and loading[-1] != key:
+                # record the cross-file reference
+                self.deps[loading[-1]].add(key)
+                self.pins.setdefault(key, set()).add(loading[-1])
+                pass
+            if key in self.cache:
+                utils.stats.count('cache.hit')
+                obj = self.cache[key]
+                self.cache.move_to_end(key)
+                pass
+            else:
+                utils.stats.count('cache.miss')
+                flight = self.inflight.get(key)
+                if flight is None:
+                    flight = self.inflight[key] = InFlight()
+                    isOwner = True
+                    pass
+                pass
             pass
-        else:
+        if isOwner:
+            obj = self.fileLoad(key, flight, profile)
+        elif flight is not None:
+            obj = self.flightWait(key, flight)
+            pass
+        if not profileIncludes(self.profiles.get(key, PROFILE_FULL), profile):
+            obj = self.fileUpgrade(key, obj, profile)
+            pass
+        if url.fragment:
+            obj = obj.idGet(url.fragment)
+            pass
+        if url.propPath:
+            obj = types.pathGet(obj, url.propPath)
+            pass
+        return obj
+
+    def fileLoad(self, key, flight, profile=PROFILE_FULL):
+        try:
             path = self.locateFile(key)
             if path is None:
                 raise Exception(
-                    "{}: can't locate url".format(url)
+                    "{}: can't locate url".format(key)
                 )
-            obj = types.DAZ.load(self.loadFile(path))
-            obj.path = key
+            data = None
+            with self.lock:
+                prefetched = self.prefetched.pop(key, None)
+                pass
+            if prefetched is not None and prefetched[0] == profile:
+                data = prefetched[1]
+                pass
+            if data is None:
+                data = self.loadFile(path, profile)
+                pass
+            obj = flight.obj = self.fileAdd(key, path, data, profile)
+            prefetched = ()
+            if self.prefetch and not self.lazyRefs:
+                # lazy references load their files when they are used
+                with utils.stats.timer('prefetch', path=path):
+                    prefetched = self.prefetchRefs(obj)
+                    pass
+                pass
+            try:
+                self.fileResolve(key, path, obj)
+            finally:
+                self.prefetchDrop(prefetched)
+                pass
+        except BaseException as e:
+            self.flightFail(key, flight, e)
+            raise
+        self.flightDone(key, flight, obj)
+        return obj
+
+    def fileUpgrade(self, key, obj, profile):
+        # add the properties of a richer profile to a loaded file
+        with self.lock:
+            if key in self.inflight:
+                # a reference back to a file that is still loading
+                return obj
+            pass
+        with self.upgradeLock:
+            if profileIncludes(self.profiles.get(key, PROFILE_FULL), profile):
+                # upgraded by another thread
+                return obj
+            data = self.loadFile(obj.filePath, profile)
+            # the referenced files are loaded with the new profile, the
+            # file keeps its properties if resolving fails
+            with self.referencing(key, profile):
+                with utils.stats.timer('construct', path=obj.filePath):
+                    obj.propsAdd(data)
+                    pass
+                pass
+            with self.lock:
+                self.profiles[key] = profile
+                if self.memoryLimit is not None:
+                    size = self.sizes.get(key)
+                    self.sizes[key] = utils.sizeOf(obj)
+                    if self.residentTotal is not None and key in self.cache:
+                        self.residentTotal += self.sizes[key] - size
+                        pass
+                    pass
+                pass
+            pass
+        utils.stats.count('profileUpgrade', path=obj.filePath)
+        return obj
+
+    def flightWait(self, key, flight):
+        thread = threading.get_ident()
+        with self.lock:
+            if flight.thread == thread:
+                # a reference cycle back to a file this thread is loading
+                return flight.obj
+            # check whether the loading thread is waiting on this thread
+            owner = flight.thread
+            while owner in self.waiting:
+                other = self.inflight.get(self.waiting[owner])
+                if other is None:
+                    break
+                owner = other.thread
+                if owner == thread:
+                    # a reference cycle between files loaded by two threads
+                    return flight.obj
+                pass
+            self.waiting[thread] = key
+            pass
+        try:
+            flight.event.wait()
+        finally:
+            with self.lock:
+                del self.waiting[thread]
+                pass
+            pass
+        if flight.error is not None:
+            raise flight.error
+        return flight.obj
+
+    def flightDone(self, key, flight, obj):
+        # publish the file once its references are resolved
+        with self.lock:
+            del self.inflight[key]
             self.cache[key] = obj
+            if self.residentTotal is not None:
+                self.residentTotal += self.sizeGet(key)
+                pass
+            flight.event.set()
+            if not self.loading:
+                self.evict()
+                pass
+            pass
+        pass
+
+    def flightFail(self, key, flight, error):
+        with self.lock:
+            del self.inflight[key]
+            self.sizes.pop(key, None)
+            self.depsRemove(key)
+            self.profiles.pop(key, None)
+            flight.error = error
+            flight.event.set()
+            pass
+        pass
+
+    async def loadURLAsync(self, url, executor=None, profile=PROFILE_FULL):
+        if not isinstance(url, utils.URL):
+            url = utils.URL(url)
+            pass
+        key = url.path
+        profileCheck(profile)
+
+        with self.lock:
+            future = self.pending.get(key)
+            flight = None
+            if future is None and key not in self.cache:
+                flight = self.inflight.get(key)
+                if flight is None:
+                    # register the load like loadURL does, so other
+                    # threads wait for it
+                    flight = self.inflight[key] = InFlight()
+                    future = self.pending[key] = asyncio.ensure_future(
+                        self.fileLoadAsync(key, flight, executor, profile)
+                    )
+                    pass
+                pass
+            pass
+        if future is not None:
+            # wait for the load already in flight in this event loop
+            await self.asyncWait(key, future)
+        elif flight is not None:
+            # wait for the load in another thread without blocking
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                executor, self.loadURL, url, profile
+            )
+        return self.loadURL(url, profile)
+
+    def asyncWaitsFor(self, key, keys):
+        # True if the task loading key waits, directly or through other
+        # tasks, for one of keys
+        stack = [key]
+        seen = set()
+        while stack:
+            key = stack.pop()
+            if key in keys:
+                return True
+            if key in seen:
+                continue
+            seen.add(key)
+            stack.extend(self.asyncWaits.get(key, ()))
+            pass
+        return False
+
+    async def asyncWait(self, key, future):
+        # wait for the task loading key unless it waits for this task
+        loading = asyncLoading.get()
+        if not loading:
+            await asyncio.shield(future)
+            return
+        if self.asyncWaitsFor(key, set(loading)):
+            # a reference cycle between tasks, the references back to
+            # the files being loaded are resolved like synchronous cycles
+            return
+        waiter = loading[-1]
+        waits = self.asyncWaits.get(waiter)
+        if waits is None:
+            waits = self.asyncWaits[waiter] = collections.Counter()
+            pass
+        waits[key] += 1
+        try:
+            await asyncio.shield(future)
+        finally:
+            waits[key] -= 1
+            if not waits[key]:
+                del waits[key]
+                pass
+            if not waits:
+                del self.asyncWaits[waiter]
+                pass
+            pass
+        pass
+
+    async def loadURLsAsync(self, urls, executor=None, profile=PROFILE_FULL):
+        return await asyncio.gather(*[
+            self.loadURLAsync(url, executor=executor, profile=profile)
+            for url in urls
+        ])
+
+    async def fileLoadAsync(self, key, flight, executor=None,
+                            profile=PROFILE_FULL):
+        # load the file of key, whose flight is registered by loadURLAsync;
+        # files loaded by this task and the tasks that it awaits
+        asyncLoading.set(asyncLoading.get() + (key,))
+        loop = asyncio.get_running_loop()
+        try:
+            path = await loop.run_in_executor(executor, self.locateFile, key)
+            if path is None:
+                raise Exception(
+                    "{}: can't locate url".format(key)
+                )
+            data = await loop.run_in_executor(
+                executor, self.loadFile, path, profile
+            )
+            obj = flight.obj = self.fileAdd(key, path, data, profile)
+            # load the referenced files before resolving references
+            # so resolving does not block on disk I/O
+            refKeys = [] if self.lazyRefs else self.refKeys(obj)
+            await asyncio.gather(*[
+                self.loadURLAsync(refKey, executor=executor, profile=profile)
+                for refKey in refKeys
+            ])
+            self.fileResolve(key, path, obj)
+        except BaseException as e:
+            self.flightFail(key, flight, e)
+            raise
+        finally:
+            del self.pending[key]
+            pass
+        self.flightDone(key, flight, obj)
+        pass
+
+    def fileAdd(self, key, path, data, profile=PROFILE_FULL):
+        size = None
+        if self.memoryLimit is not None:
+            size = utils.sizeOf(data)
+            pass
+        with utils.stats.timer('construct', path=path):
+            obj = types.DAZ.load(data, lazy=self.lazyLibraries,
+                                 lazyRefs=self.lazyRefs)
+            pass
+        obj.path = key
+        obj.filePath = path
+        if self.sidecars is not None:
+            obj.sidecar = self.sidecars.get(path)
+            pass
+        with self.lock:
+            if size is not None:
+                self.sizes[key] = size
+                pass
+            self.deps[key] = set()
+            self.profiles[key] = profile
+            pass
+        return obj
+
+    def fileResolve(self, key, path, obj):
+        with self.referencing(key):
             obj.refsLoad()
-            if utils.verbose:
-                if utils.verbose > 2:
-                    print(
-                        "loaded file \"{}\" = {}".format(
-                            path, utils.toJSON(obj.asset_info)
-                        )
+            pass
+        if utils.verbose:
+            if utils.verbose > 2:
+                print(
+                    "loaded file \"{}\" = {}".format(
+                        path, utils.toJSON(obj.asset_info)
                     )
-                else:
-                    print("loaded file \"{}\"".format(path))
+                )
+            else:
+                print("loaded file \"{}\"".format(path))
+                pass
+            if utils.verbose > 1:
+                for asset in obj.assets:
+                    print(" ", asset.treePath(sep=" > ", idFormat=" #{}"))
+                    pass
+                pass
+            pass
+        pass
+
+    def refKeys(self, obj):
+        # return the keys of the files referenced by obj that are not loaded
+        keys = []
+        for url in obj.refURLs():
+            url = utils.URL(url)
+            key = url.path
+            if (url.scheme == 'name' or not key or key in keys or
+                key in self.cache):
+                continue
+            keys.append(key)
+            pass
+        return keys
+
+    def prefetchRefs(self, obj):
+        # read the files referenced by obj concurrently
+        # with the profile of obj's file, returns the keys read
+        profile = self.profiles.get(obj.path, PROFILE_FULL)
+        paths = {}
+        for key in self.refKeys(obj):
+            if key in self.prefetched or key in self.inflight:
+                continue
+            path = self.locateFile(key)
+            if path is not None:
+                paths[key] = path
+                pass
+            pass
+        if not paths:
+            return []
+        keys = []
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.prefetch) as executor:
+            futures = {
+                key: executor.submit(self.loadFile, path, profile)
+                for key, path in paths.items()
+            }
+            for key, future in futures.items():
+                try:
+                    data = future.result()
+                except Exception:
+                    # report the error when the reference is resolved
+                    continue
+                with self.lock:
+                    self.prefetched[key] = (profile, data)
+                    pass
+                keys.append(key)
+                pass
+            pass
+        return keys
+
+    def prefetchDrop(self, keys):
+        # forget the prefetched files that resolving didn't load
+        with self.lock:
+            for key in keys:
+                if self.prefetched.pop(key, None) is not None:
+                    utils.stats.count('prefetch.unused')
                     pass
-                if utils.verbose > 1:
-                    for asset in obj.assets:
-                        print(" ", asset.treePath(sep=" > ", idFormat=" #{}"))
+                pass
+            pass
+        pass
+
+    @contextlib.contextmanager
+    def referencing(self, key, profile=None):
+        # record the files loaded in the block as references of key,
+        # which are loaded with profile (by default key's profile)
+        with self.lock:
+            tracked = key in self.deps
+            if tracked:
+                self.active[key] += 1
+                pass
+            pass
+        if tracked:
+            self.loading.append(key)
+            self.loadingProfiles.append(profile)
+            pass
+        try:
+            yield
+        finally:
+            if tracked:
+                self.loading.pop()
+                self.loadingProfiles.pop()
+                with self.lock:
+                    self.active[key] -= 1
+                    if not self.active[key]:
+                        del self.active[key]
                         pass
                     pass
                 pass
             pass
-        if url.fragment:
-            obj = obj.idGet(url.fragment)
+        pass
+
+    def referrers(self, target, key=None):
+        # the (source, key) references to target of all loaded files,
+        # their deferred references to target are resolved first
+        with self.lock:
+            files = list(self.cache.values())
             pass
-        if url.propPath:
-            obj = types.pathGet(obj, url.propPath)
+        refs = []
+        for daz in files:
+            refs.extend(daz.referrers(target, key))
             pass
-        return obj
+        return refs
+
+    def sizeGet(self, key):
+        size = self.sizes.get(key)
+        if size is None:
+            size = self.sizes[key] = utils.sizeOf(self.cache[key])
+            pass
+        return size
+
+    def residentBytes(self):
+        with self.lock:
+            return {key: self.sizeGet(key) for key in self.cache}
+
+    def evict(self):
+        if self.memoryLimit is None or self.pending:
+            # files being loaded asynchronously are not pinned yet
+            return
+        with self.lock:
+            if self.residentTotal is None:
+                self.residentTotal = sum(self.residentBytes().values())
+                pass
+            # evict the least recently used files that no other loaded
+            # or loading file references and whose references aren't
+            # being resolved, or such a group of files referencing
+            # each other
+            skipped = 0
+            while (self.residentTotal > self.memoryLimit and
+                   skipped < len(self.cache)):
+                key = next(iter(self.cache))
+                if key in self.active or self.pins.get(key):
+                    group = self.cycleGet(key)
+                    if group is None:
+                        # in use, so recently used
+                        self.cache.move_to_end(key)
+                        skipped += 1
+                        continue
+                    pass
+                else:
+                    group = [key]
+                    pass
+                for key in group:
+                    self.remove(key)
+                    pass
+                skipped = 0
+                pass
+            pass
+        pass
+
+    def cycleGet(self, key):
+        # the files referencing key directly or indirectly if they are
+        # all loaded, idle and referenced by key, else None
+        group = set()
+        stack = [key]
+        while stack:
+            other = stack.pop()
+            if other in group:
+                continue
+            if other not in self.cache or other in self.active:
+                return None
+            group.add(other)
+            stack.extend(self.pins.get(other, ()))
+            pass
+        reached = set()
+        stack = [key]
+        while stack:
+            other = stack.pop()
+            if other in reached or other not in group:
+                continue
+            reached.add(other)
+            stack.extend(self.deps.get(other, ()))
+            pass
+        if reached != group:
+            return None
+        return group
+
+    def depsRemove(self, key):
+        # forget the references of key, which unpins the files
+        for dep in self.deps.pop(key, ()):
+            pins = self.pins.get(dep)
+            if pins is not None:
+                pins.discard(key)
+                if not pins:
+                    del self.pins[dep]
+                    pass
+                pass
+            pass
+        pass
+
+    def remove(self, key):
+        if utils.verbose:
+            print("evicting file \"{}\"".format(key))
+            pass
+        with self.lock:
+            del self.cache[key]
+            size = self.sizes.pop(key, None)
+            if self.residentTotal is not None:
+                self.residentTotal -= size
+                pass
+            self.depsRemove(key)
+            self.profiles.pop(key, None)
+            pass
+        pass
 
     def locateFile(self, path):
+        with utils.stats.timer('locate'):
+            return self.locateFileSearch(path)
+
+    def locateFileSearch(self, path):
+        if self.fileIndex is not None:
+            return self.fileIndex.locate(path)
         if os.path.exists(path):
             return path
         for searchDir in SearchPath:
@@ -89,24 +1113,88 @@ class Cache:
             pass
         return None
 
-    def loadFile(self, path):
-        if utils.verbose:
-            print("loading file \"{}\"...".format(path))
-            pass
+    def loadFile(self, path, profile=PROFILE_FULL):
+        # return the parsed data of the properties of profile
+        profileCheck(profile)
         root, ext = os.path.splitext(path)
         if ext not in ('.duf', '.dsf'):
             raise Exception(
                 "{}: unknown file type".format(path)
             )
-        if isGzipped(path):
-            with gzip.open(path, 'rb') as rb:
-                return json.load(codecs.getreader('utf-8')(rb))
+        if self.diskCache is not None:
+            variant = 'lazy' if self.lazyArrays else ''
+            if profile != PROFILE_FULL:
+                variant = "{}:{}".format(variant, profile)
+                pass
+            with utils.stats.timer('diskCache.get', path=path):
+                data = self.diskCache.get(path, variant)
+                pass
+            if data is not None:
+                utils.stats.count('diskCache.hit', path=path)
+                return data
+            utils.stats.count('diskCache.miss', path=path)
+            data = self.parseFile(path, profile)
+            with utils.stats.timer('diskCache.put', path=path):
+                self.diskCache.put(path, data, variant)
+                pass
+            return data
+        return self.parseFile(path, profile)
+
+    def parseFile(self, path, profile=PROFILE_FULL):
+        if utils.verbose:
+            print("loading file \"{}\"...".format(path))
             pass
-        else:
-            with open(path, 'r') as r:
-                return json.load(r)
+        stats = utils.stats
+        with stats.timer('read', path=path):
+            with open(path, 'rb') as rb:
+                raw = rb.read()
+                pass
             pass
-        pass
+        stats.count('bytesRead', len(raw), path=path)
+
+        decoder = decoderGet(raw)
+        if decoder is not None:
+            with stats.timer('decompress', path=path):
+                raw = decoder.decompress(raw)
+                pass
+            pass
+        stats.count('bytesDecoded', len(raw), path=path)
+
+        keys = PROFILES[profile]
+        with stats.timer('decode', path=path):
+            if keys is not None:
+                cut = profileCut(raw, keys)
+                if cut is not None:
+                    stats.count('bytesSkipped', len(raw) - len(cut),
+                                path=path)
+                    raw = cut
+                    pass
+                pass
+            if self.lazyArrays:
+                data = lazyLoads(raw)
+            else:
+                data = json.loads(raw)
+                pass
+            if keys is not None:
+                data = {key: value for key, value in data.items()
+                        if key in keys}
+                pass
+            pass
+        if utils.verbose > 1:
+            phases = stats.files[path]['phases']
+            print(
+                "read {} bytes, decoded {} bytes in {:.3f}s".format(
+                    stats.files[path]['counters']['bytesRead'],
+                    len(raw),
+                    sum(phase['time'] for phase in phases.values())
+                )
+            )
+            pass
+        return data
     pass
 
-cache = Cache()
+# DSON_CACHE_DIR enables the DiskCache, the directory must not be
+# writable by other users (see DiskCache)
+cache = Cache(
+    diskCache=DiskCache() if os.environ.get('DSON_CACHE_DIR') else None
+)
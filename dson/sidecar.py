@@ -0,0 +1,280 @@
+import array
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+from . import utils
+
+# Columnar sidecar files hold the large number arrays of a DSON file
+# as typed binary columns that can be memory-mapped:
+#
+#   magic    8 bytes  b'DSONCOLS'
+#   size     uint32   length of the JSON header
+#   header   JSON     {"version": 1,
+#                      "byteorder": "little",
+#                      "source": {"size": bytes, "mtime": nanoseconds},
+#                      "columns": {asset_id: {name: column, ...}, ...}}
+#   columns  binary   each column starts on a COLUMN_ALIGN boundary
+#
+# column = {"format": "f" | "i", "shape": [n, ...], "offset": bytes}
+#
+# Geometry columns (asset id of the geometry):
+#   vertices                 float32 (vertex_count, 3)
+#   polygon_offsets          int32 (poly_count + 1) CSR offsets
+#   polygon_indices          int32 vertex indices of all polygons
+#   polygon_groups           int32 (poly_count) polygon group index
+#   polygon_material_groups  int32 (poly_count) material group index
+# UVSet columns (asset id of the uv set):
+#   uvs                      float32 (uv_count, 2)
+#   polygon_vertex_indices   int32 (count, 3)
+# Morph columns (asset id of the modifier):
+#   delta_indices            int32 (count) vertex indices
+#   deltas                   float32 (count, 3)
+
+MAGIC = b'DSONCOLS'
+
+VERSION = 1
+
+COLUMN_ALIGN = 16
+
+EXT = '.cols'
+
+def align(offset):
+    return (offset + COLUMN_ALIGN - 1) // COLUMN_ALIGN * COLUMN_ALIGN
+
+def values(obj, key):
+    # return the values array of a DSON array property
+    prop = obj.get(key)
+    if isinstance(prop, dict):
+        prop = prop.get('values')
+        pass
+    return prop
+
+def geometryColumns(geometry):
+    columns = {}
+    vertices = values(geometry, 'vertices')
+    if vertices is not None:
+        columns['vertices'] = (
+            array.array('f', [x for vertex in vertices for x in vertex]),
+            [len(vertices), 3]
+        )
+        pass
+    polylist = values(geometry, 'polylist')
+    if polylist is not None:
+        offsets = array.array('i', [0])
+        indices = array.array('i')
+        groups = array.array('i')
+        materialGroups = array.array('i')
+        for poly in polylist:
+            groups.append(poly[0])
+            materialGroups.append(poly[1])
+            indices.extend(poly[2:])
+            offsets.append(len(indices))
+            pass
+        columns['polygon_offsets'] = (offsets, [len(offsets)])
+        columns['polygon_indices'] = (indices, [len(indices)])
+        columns['polygon_groups'] = (groups, [len(groups)])
+        columns['polygon_material_groups'] = (
+            materialGroups, [len(materialGroups)]
+        )
+        pass
+    return columns
+
+def uvSetColumns(uvSet):
+    columns = {}
+    uvs = values(uvSet, 'uvs')
+    if uvs is not None:
+        columns['uvs'] = (
+            array.array('f', [x for uv in uvs for x in uv]),
+            [len(uvs), 2]
+        )
+        pass
+    pvi = uvSet.get('polygon_vertex_indices')
+    if pvi is not None:
+        columns['polygon_vertex_indices'] = (
+            array.array('i', [x for rec in pvi for x in rec]),
+            [len(pvi), 3]
+        )
+        pass
+    return columns
+
+def morphColumns(morph):
+    columns = {}
+    deltas = values(morph, 'deltas')
+    if deltas is not None:
+        columns['delta_indices'] = (
+            array.array('i', [delta[0] for delta in deltas]),
+            [len(deltas)]
+        )
+        columns['deltas'] = (
+            array.array('f', [x for delta in deltas for x in delta[1:4]]),
+            [len(deltas), 3]
+        )
+        pass
+    return columns
+
+def columnsGet(data):
+    # collect the columns of the parsed DSON data by asset id
+    columns = {}
+    for geometry in data.get('geometry_library', ()):
+        columns[geometry['id']] = geometryColumns(geometry)
+        pass
+    for uvSet in data.get('uv_set_library', ()):
+        columns[uvSet['id']] = uvSetColumns(uvSet)
+        pass
+    for modifier in data.get('modifier_library', ()):
+        morph = modifier.get('morph')
+        if morph is not None:
+            columns[modifier['id']] = morphColumns(morph)
+            pass
+        pass
+    return {id: cols for id, cols in columns.items() if cols}
+
+def write(path, sourcePath, data):
+    stat = os.stat(sourcePath)
+    header = {
+        'version': VERSION,
+        'byteorder': sys.byteorder,
+        'source': {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns
+        },
+        'columns': {}
+    }
+    blobs = []
+    offset = 0
+    for id, columns in columnsGet(data).items():
+        header['columns'][id] = {}
+        for name, (values, shape) in columns.items():
+            assert values.itemsize == 4
+            offset = align(offset)
+            header['columns'][id][name] = {
+                'format': values.typecode,
+                'shape': shape,
+                'offset': offset
+            }
+            blobs.append((offset, values))
+            offset += len(values) * values.itemsize
+            pass
+        pass
+    headerData = json.dumps(header).encode('utf-8')
+    dataStart = align(len(MAGIC) + 4 + len(headerData))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmpPath = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmpPath, 'wb') as wb:
+        wb.write(MAGIC)
+        wb.write(struct.pack('<I', len(headerData)))
+        wb.write(headerData)
+        for offset, values in blobs:
+            wb.seek(dataStart + offset)
+            values.tofile(wb)
+            pass
+        pass
+    os.replace(tmpPath, path)
+    if utils.verbose:
+        print("wrote sidecar \"{}\"".format(path))
+        pass
+    pass
+
+class Sidecar:
+    # a memory-mapped sidecar file
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as rb:
+            self.mmap = mmap.mmap(rb.fileno(), 0, access=mmap.ACCESS_READ)
+            pass
+        if self.mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise Exception(
+                "{}: not a sidecar file".format(path)
+            )
+        start = len(MAGIC) + 4
+        size, = struct.unpack_from('<I', self.mmap, len(MAGIC))
+        self.header = json.loads(self.mmap[start:start + size])
+        self.dataStart = align(start + size)
+        pass
+
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+            pass
+        pass
+
+    def isFresh(self, sourcePath):
+        header = self.header
+        if (header.get('version') != VERSION or
+            header.get('byteorder') != sys.byteorder):
+            return False
+        stat = os.stat(sourcePath)
+        source = header['source']
+        return (source['size'] == stat.st_size and
+                source['mtime'] == stat.st_mtime_ns)
+
+    def column(self, id, name):
+        # return a zero-copy view of the column or None
+        column = self.header['columns'].get(id, {}).get(name)
+        if column is None:
+            return None
+        shape = column['shape']
+        count = 1
+        for dim in shape:
+            count *= dim
+            pass
+        start = self.dataStart + column['offset']
+        view = memoryview(self.mmap)[start:start + count * 4]
+        if count == 0:
+            # memoryview can't cast to a shape with zeros
+            return view.cast(column['format'])
+        return view.cast(column['format'], shape)
+    pass
+
+class SidecarStore:
+    """location of the sidecar files
+
+    Sidecars are kept next to their DSON files unless a directory is
+    given, in which case they are named after the DSON file path.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        pass
+
+    def pathGet(self, sourcePath):
+        if self.path is None:
+            return sourcePath + EXT
+        name = hashlib.sha1(
+            os.path.abspath(sourcePath).encode('utf-8')
+        ).hexdigest()
+        return os.path.join(self.path, name[:2], name + EXT)
+
+    def get(self, sourcePath):
+        # return the sidecar of sourcePath if it is up to date
+        path = self.pathGet(sourcePath)
+        if not os.path.exists(path):
+            return None
+        try:
+            sidecar = Sidecar(path)
+        except Exception:
+            print("WARNING: ignoring invalid sidecar \"{}\"".format(path))
+            return None
+        if not sidecar.isFresh(sourcePath):
+            sidecar.close()
+            return None
+        return sidecar
+
+    def isFresh(self, sourcePath):
+        sidecar = self.get(sourcePath)
+        if sidecar is None:
+            return False
+        sidecar.close()
+        return True
+
+    def write(self, sourcePath, data):
+        write(self.pathGet(sourcePath), sourcePath, data)
+        pass
+    pass
@@ -0,0 +1,227 @@
+from .arrays import numpy, numpyRequire
+from . import types
+
+# World transforms of a Node hierarchy, following
+# http://docs.daz3d.com/doku.php/public/dson_spec/object_definitions/node/start
+#
+#   local = T(center_point + translation)
+#         * orientation * rotation * scale * inv(orientation)
+#         * T(-center_point)
+#   world = parent.world * local
+#
+# scale = scale * general_scale; nodes that don't inherit their parent's
+# scale remove it with inv(parent.scale) between the two.
+# Rotations are in degrees and applied in rotation_order (the JS viewer's
+# boneRotate): 'XYZ' rotates about X first, then Y, then Z.
+# Matrices are 4x4 and transform column vectors.
+
+AXES = 'XYZ'
+
+CHANNELS = ('center_point', 'orientation', 'rotation', 'translation', 'scale')
+
+def channelGet(node, name, default):
+    # the current x, y, z values of a channel array
+    value = types.Channel.unpack(node.propFind(name, exclude='preview'))
+    if not isinstance(value, dict):
+        return [default] * 3
+    return [value.get(axis, default) for axis in ('x', 'y', 'z')]
+
+def generalScaleGet(node):
+    chan = node.propFind('general_scale', exclude='preview')
+    if isinstance(chan, types.Channel):
+        return chan.get('current_value', chan.get('value', 1))
+    return 1
+
+def rotations(angles, orders):
+    # (n, 3, 3) rotation matrices of angles (n, 3) in degrees
+    radians = numpy.radians(angles)
+    cos = numpy.cos(radians)
+    sin = numpy.sin(radians)
+    count = len(angles)
+    axes = numpy.zeros((3, count, 3, 3))
+    for axis in range(3):
+        # right-handed rotation about a single axis
+        i, j = (axis + 1) % 3, (axis + 2) % 3
+        axes[axis, :, axis, axis] = 1
+        axes[axis, :, i, i] = cos[:, axis]
+        axes[axis, :, j, j] = cos[:, axis]
+        axes[axis, :, i, j] = -sin[:, axis]
+        axes[axis, :, j, i] = sin[:, axis]
+        pass
+    result = numpy.empty((count, 3, 3))
+    for order in set(orders):
+        rows = numpy.array([o == order for o in orders])
+        first, second, third = [AXES.index(axis) for axis in order]
+        result[rows] = (axes[third, rows] @ axes[second, rows] @
+                        axes[first, rows])
+        pass
+    return result
+
+def affine(linear, center, offset):
+    # 4x4 matrices of T(offset) * linear * T(-center)
+    count = len(linear)
+    result = numpy.zeros((count, 4, 4))
+    result[:, :3, :3] = linear
+    result[:, :3, 3] = offset - numpy.einsum('nij,nj->ni', linear, center)
+    result[:, 3, 3] = 1
+    return result
+
+class TransformEngine:
+    """world transforms of all nodes below a root node
+
+    The nodes are kept in topological order (parents first) with their
+    channel values in arrays. set() marks a node dirty and update()
+    recomputes the local matrices of the dirty nodes and the world
+    matrices of their subtrees, one hierarchy level at a time.
+    """
+
+    def __init__(self, root):
+        numpyRequire()
+        self.nodes = []
+        parents = []
+        depths = []
+        stack = [(root, -1, 0)]
+        while stack:
+            node, parent, depth = stack.pop()
+            index = len(self.nodes)
+            self.nodes.append(node)
+            parents.append(parent)
+            depths.append(depth)
+            for child in reversed(node.children):
+                stack.append((child, index, depth + 1))
+                pass
+            pass
+        count = len(self.nodes)
+        self.index = {}
+        for index, node in enumerate(self.nodes):
+            id = node.get('id')
+            if id is not None and id not in self.index:
+                self.index[id] = index
+                pass
+            pass
+        self.parents = numpy.array(parents, dtype=numpy.int32)
+        self.depths = numpy.array(depths, dtype=numpy.int32)
+        self.orders = [
+            node.propFind('rotation_order', exclude='preview') or 'XYZ'
+            for node in self.nodes
+        ]
+        self.inheritsScale = numpy.array([
+            node.propFind('inherits_scale', exclude='preview') is not False
+            for node in self.nodes
+        ])
+        self.channels = {}
+        for name in CHANNELS:
+            default = 1 if name == 'scale' else 0
+            self.channels[name] = numpy.array(
+                [channelGet(node, name, default) for node in self.nodes],
+                dtype=numpy.float64
+            ).reshape(count, 3)
+            pass
+        self.generalScale = numpy.array(
+            [generalScaleGet(node) for node in self.nodes],
+            dtype=numpy.float64
+        )
+        self.local = numpy.zeros((count, 4, 4))
+        self.scale = numpy.zeros((count, 4, 4))
+        self.world = numpy.zeros((count, 4, 4))
+        self.dirty = numpy.ones(count, dtype=bool)
+        self.update()
+        # the rest pose for skinning transforms
+        self.rest = self.world.copy()
+        pass
+
+    def indexGet(self, node):
+        if isinstance(node, int):
+            return node
+        if not isinstance(node, str):
+            node = node.get('id')
+            pass
+        index = self.index.get(node)
+        if index is None:
+            raise Exception("unknown node {}".format(node))
+        return index
+
+    def set(self, node, name, value, axis=None):
+        """set a channel of a node
+
+        name is one of CHANNELS or 'general_scale'; value is an
+        [x, y, z] vector or a number when axis ('x', 'y' or 'z') is given
+        """
+        index = self.indexGet(node)
+        if name == 'general_scale':
+            self.generalScale[index] = value
+        elif axis is None:
+            self.channels[name][index] = value
+        else:
+            self.channels[name][index, 'xyz'.index(axis)] = value
+            pass
+        self.dirty[index] = True
+        pass
+
+    def localUpdate(self, rows):
+        center = self.channels['center_point'][rows]
+        orientation = rotations(self.channels['orientation'][rows],
+                                [self.orders[i] for i in rows])
+        rotation = rotations(self.channels['rotation'][rows],
+                             [self.orders[i] for i in rows])
+        scale = (self.channels['scale'][rows] *
+                 self.generalScale[rows, None])
+        orientationInv = orientation.transpose(0, 2, 1)
+        scaling = orientation @ (scale[:, :, None] * orientationInv)
+        self.scale[rows] = affine(scaling, center, center)
+        self.local[rows] = affine(
+            orientation @ rotation @ (scale[:, :, None] * orientationInv),
+            center,
+            center + self.channels['translation'][rows]
+        )
+        pass
+
+    def update(self):
+        # recompute the dirty nodes and their subtrees, returns the
+        # indices of the nodes whose world transforms changed
+        if not self.dirty.any():
+            return numpy.zeros(0, dtype=numpy.int32)
+        self.localUpdate(numpy.flatnonzero(self.dirty))
+        # parents come first, so one pass marks the subtrees
+        changed = self.dirty.copy()
+        parents = self.parents
+        for index in numpy.flatnonzero(parents >= 0):
+            if changed[parents[index]]:
+                changed[index] = True
+                pass
+            pass
+        for depth in range(int(self.depths[changed].max()) + 1):
+            rows = numpy.flatnonzero(changed & (self.depths == depth))
+            if not len(rows):
+                continue
+            parentRows = parents[rows]
+            hasParent = parentRows >= 0
+            world = self.local[rows].copy()
+            if hasParent.any():
+                prows = parentRows[hasParent]
+                parentWorld = self.world[prows]
+                noInherit = ~self.inheritsScale[rows[hasParent]]
+                if noInherit.any():
+                    parentWorld[noInherit] = (
+                        parentWorld[noInherit] @
+                        numpy.linalg.inv(self.scale[prows[noInherit]])
+                    )
+                    pass
+                world[hasParent] = parentWorld @ world[hasParent]
+                pass
+            self.world[rows] = world
+            pass
+        self.dirty[:] = False
+        return numpy.flatnonzero(changed)
+
+    def worldGet(self, node):
+        self.update()
+        return self.world[self.indexGet(node)]
+
+    def skinTransforms(self, ids):
+        # world * inv(rest world) of the nodes in ids (eg, the jointIds
+        # of dson.arrays.SkinArrays) for dson.arrays.skin
+        self.update()
+        rows = [self.indexGet(id) for id in ids]
+        return self.world[rows] @ numpy.linalg.inv(self.rest[rows])
+    pass
@@ -1,7 +1,12 @@
 import collections
+import collections.abc
+import threading
 
+from . import animation
+from . import arrays
 from . import utils
 from . import reader
+from . import transforms
 
 def debugFmt(obj):
     if obj is None:
@@ -64,10 +69,13 @@ def objDesc(obj):
         "don't know how to describe object {}".format(obj)
     )
 
-def forEach(obj, pred=None, allowLists=False):
+def forEach(obj, pred=None, allowLists=False, construct=True):
+    # construct=False skips the lazy library entries
     if allowLists and isinstance(obj, list):
+        if not construct and isinstance(obj, LibraryList):
+            return
         for child in obj:
-            yield from forEach(child, pred=pred)
+            yield from forEach(child, pred=pred, construct=construct)
             pass
         pass
     elif isinstance(obj, Object):
@@ -75,12 +83,94 @@ def forEach(obj, pred=None, allowLists=False):
             yield obj
             pass
         for value in obj.values():
-            yield from forEach(value, pred=pred, allowLists=True)
+            yield from forEach(value, pred=pred, allowLists=True,
+                               construct=construct)
             pass
         pass
     pass
 
+def propIndexKey(exclude):
+    if exclude is None or isinstance(exclude, str):
+        return exclude
+    return frozenset(exclude)
+
+def isNumberArray(value):
+    # arrays of numbers (or arrays of numbers) never contain properties
+    if not value:
+        return True
+    first = value[0]
+    if isinstance(first, list):
+        if not first:
+            return False
+        first = first[0]
+        pass
+    return isinstance(first, (int, float))
+
+def propIndexGet(obj, exclude=None):
+    if isinstance(obj, Object):
+        return obj.propIndex(exclude)
+    if isinstance(obj, (dict, list)):
+        return propIndexBuild(obj, exclude)
+    return {}
+
+def propIndexBuild(obj, exclude=None):
+    # map every target id to the value propFind returns for it
+    # (without following instDef), in order of precedence:
+    # id, name or type match, property match, child match
+    index = {}
+    if isinstance(obj, LibraryList):
+        # only the constructed entries, constructing one resets the
+        # indexes and the others are found by DAZ.idLookup
+        for child in reversed(list(obj.entries())):
+            if isinstance(child, Object):
+                index.update(propIndexGet(child, exclude))
+                pass
+            pass
+        return index
+    if isinstance(obj, list):
+        if not isNumberArray(obj):
+            # earlier elements take precedence
+            for child in reversed(obj):
+                if isinstance(child, (Object, dict, list)):
+                    index.update(propIndexGet(child, exclude))
+                    pass
+                pass
+            pass
+        return index
+    children = []
+    for childName, child in obj.items():
+        if exclude and childName in exclude:
+            continue
+        if isinstance(child, (Object, dict, list)):
+            children.append(child)
+            pass
+        pass
+    for child in reversed(children):
+        index.update(propIndexGet(child, exclude))
+        pass
+    for key, value in obj.items():
+        if value is not None:
+            index[key] = value
+            pass
+        pass
+    for key in ('type', 'name', 'id'):
+        value = obj.get(key)
+        if isinstance(value, str):
+            index[value] = obj
+            pass
+        pass
+    return index
+
 def propFind(obj, targetId, useInstDef=True, defValue=None, exclude=None):
+    if not useInstDef and isinstance(obj, Object):
+        pval = obj.propIndex(exclude).get(targetId)
+        if pval is None and isinstance(obj, DAZ) and obj.lazyIds:
+            # an unconstructed library entry
+            pval = obj.idLookup(targetId)
+            pass
+        if pval is not None:
+            return pval
+        return defValue
     if isinstance(obj, (Object, dict)):
         if targetId == obj.get('id'):
             # id match
@@ -211,7 +301,7 @@ def urlFind(obj, url):
             return None
         pass
     if obj and url.propPath:
-        obj = obj.propFind(url.propPath)
+        obj = obj.propFind(*url.propPath)
         if obj is None:
             print("WARNING: unknown property in url {} for {}".format(
                 url,
@@ -231,13 +321,159 @@ def urlGet(obj, url):
         )
     return value
 
+def srcDataGet(value):
+    # rebuild the DSON data of a loaded value
+    if isinstance(value, Object):
+        return {key: srcDataGet(child) for key, child in value.data.items()}
+    if isinstance(value, Ref):
+        return value.url
+    if isinstance(value, LibraryList):
+        return [srcDataGet(child) for child in value.entries()]
+    if isinstance(value, list) and not isNumberArray(value):
+        return [srcDataGet(child) for child in value]
+    return value
+
+def urlTargetKey(url, path):
+    # (file path, asset id) of the target of url in the file path
+    url = utils.URL(url)
+    return (url.path or path, url.fragment)
+
+def targetKey(obj):
+    # (file path, asset id) of obj, as Ref.targetKey
+    return (getattr(obj.rootGet(), 'path', None), obj.get('id'))
+
+def referrerAdd(source, key, target):
+    # record the reference in the reverse index of the source's file
+    if isinstance(target, Object):
+        root = source.idRootGet()
+        if isinstance(root, DAZ):
+            root.referrerAdd(source, key, target)
+            pass
+        pass
+    pass
+
 class Ref:
+    __slots__ = ('url', 'parent', 'key', 'target')
+
     def __init__(self, url):
         self.url = url
-        self.obj = None
+        # the referencing object and property until a deferred
+        # reference is resolved
+        self.parent = None
+        self.key = None
+        self.target = None
+        pass
+
+    @property
+    def obj(self):
+        if self.parent is not None:
+            # resolve a deferred reference, errors surface here; the
+            # files it loads are references of the parent's file
+            path = getattr(self.parent.rootGet(), 'path', None)
+            with reader.cache.referencing(path):
+                self.load(self.parent, self.key)
+                pass
+            pass
+        return self.target
+
+    def load(self, parent, key=None):
+        self.target = urlGet(parent, self.url)
+        self.parent = None
+        self.key = None
+        referrerAdd(parent, key, self.target)
+        parent.refResolved(key, self.target)
         pass
-    def load(self, parent):
-        self.obj = urlGet(parent, self.url)
+
+    def defer(self, parent, key=None):
+        # resolve the reference on the first access of obj, or when the
+        # referrers or children of its target are needed
+        self.parent = parent
+        self.key = key
+        root = parent.idRootGet()
+        if isinstance(root, DAZ):
+            root.deferredRefAdd(self)
+            pass
+        pass
+
+    def isDeferred(self):
+        return self.parent is not None
+
+    def targetKey(self, parent=None):
+        # (file path, asset id) of the target, without resolving it
+        path = getattr((parent or self.parent).rootGet(), 'path', None)
+        return urlTargetKey(self.url, path)
+    pass
+
+class LibraryList(list):
+    """library array of a lazily loaded DAZ object
+
+    Entries hold their DSON data until they are accessed by index,
+    iteration or id, which constructs the typed Object and loads its
+    references. Node.children constructs the entries whose parent is
+    the node, other state filled in by the references of the entries
+    (eg, DAZ.referrers) only covers the constructed entries.
+    """
+    __slots__ = ('parent', 'cls')
+
+    def __init__(self, parent, cls, srcData):
+        list.__init__(self, srcData)
+        self.parent = parent
+        self.cls = cls
+        for index, entry in enumerate(srcData):
+            id = entry.get('id')
+            if id is not None:
+                assert id not in parent.lazyIds
+                parent.lazyIds[id] = (self, index)
+                pass
+            pass
+        pass
+
+    def entries(self):
+        # the entries without constructing them
+        return list.__iter__(self)
+
+    def entryLoad(self, index):
+        entry = list.__getitem__(self, index)
+        if isinstance(entry, Object):
+            return entry
+        parent = self.parent
+        with parent.lazyLock:
+            entry = list.__getitem__(self, index)
+            if isinstance(entry, Object):
+                # constructed by another thread
+                return entry
+            obj = self.cls.load(entry, parent=parent)
+            list.__setitem__(self, index, obj)
+            id = entry.get('id')
+            if id is not None:
+                del parent.lazyIds[id]
+                pass
+            parent.propIndexReset()
+            Object.generation += 1
+            # references back to this entry find it in the idMap
+            obj.refsLoad()
+            pass
+        return obj
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.entryLoad(i)
+                    for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+            pass
+        return self.entryLoad(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.entryLoad(index)
+            pass
+        pass
+
+    def __reversed__(self):
+        for index in reversed(range(len(self))):
+            yield self.entryLoad(index)
+            pass
         pass
     pass
 
@@ -261,7 +497,7 @@ class PropDef:
     def checkType(self, value, expectedType=None):
         if expectedType is None:
             if self.isArray:
-                expectedType = list
+                expectedType = (list, utils.LazyArray)
             else:
                 expectedType = dict
                 pass
@@ -295,7 +531,7 @@ class PropDef:
             return cls.load(value, parent=parent)
         return value
 
-    def refLoad(self, parent, key, value):
+    def refLoad(self, parent, key, value, lazy=False):
         if not self.isRef:
             return value
         if self.isArray:
@@ -304,14 +540,25 @@ class PropDef:
                 child = value[i]
                 if not isinstance(child, Ref):
                     ref = Ref(child)
-                    ref.load(parent)
+                    if lazy:
+                        ref.defer(parent, key)
+                    else:
+                        ref.load(parent, key)
+                        pass
                     value[i] = ref
                     pass
                 pass
             return value
         if not isinstance(value, Ref):
             ref = Ref(value)
-            ref.load(parent)
+            if lazy:
+                ref.defer(parent, key)
+                if self.isInstDef:
+                    # Object.instDef resolves it
+                    parent.instDef = ref
+                    pass
+                return ref
+            ref.load(parent, key)
             if self.isInstDef:
                 parent.instDef = ref.obj
                 pass
@@ -325,11 +572,43 @@ class PropArrayDef(PropDef):
         pass
     pass
 
+class PropLibraryDef(PropArrayDef):
+    def load(self, parent, key, value):
+        if parent.lazyIds is None:
+            return PropArrayDef.load(self, parent, key, value)
+        self.checkType(value)
+        return LibraryList(parent, self.clsGet(), value)
+    pass
+
 class PropDefs:
     def __init__(self, *args):
         self.pdefsAll = [self.build(arg) for arg in args]
+        # flat map of all property definitions, see compile
+        self.table = None
+        # (key, pdef) of the reference properties
+        self.refs = None
         pass
 
+    def compile(self):
+        # flatten the chain of property definitions,
+        # the first definition of a key takes precedence
+        if self.table is not None:
+            return self
+        table = {}
+        for pdefs in self.pdefsAll:
+            if isinstance(pdefs, PropDefs):
+                pdefs = pdefs.compile().table
+                pass
+            for key, pdef in pdefs.items():
+                if key not in table:
+                    table[key] = pdef
+                    pass
+                pass
+            pass
+        self.refs = [(key, pdef) for key, pdef in table.items() if pdef.isRef]
+        self.table = table
+        return self
+
     def build(self, pdefs):
         if isinstance(pdefs, PropDefs):
             return pdefs
@@ -350,12 +629,10 @@ class PropDefs:
         return patched
 
     def get(self, key):
-        for pdefs in self.pdefsAll:
-            pdef = pdefs.get(key)
-            if pdef is not None:
-                return pdef
+        if self.table is None:
+            self.compile()
             pass
-        return None
+        return self.table.get(key)
 
     def load(self, parent, key, value):
         pdef = self.get(key)
@@ -369,24 +646,23 @@ class PropDefs:
         )
         return value
 
-    def refsLoad(self, parent):
-        for pdefs in self.pdefsAll:
-            if isinstance(pdefs, dict):
-                for key, pdef in pdefs.items():
-                    self.refLoad(parent, pdef, key)
-                    pass
-                pass
-            else:
-                pdefs.refsLoad(parent)
-                pass
+    def refDefs(self):
+        if self.refs is None:
+            self.compile()
+            pass
+        return self.refs
+
+    def refsLoad(self, parent, lazy=False):
+        for key, pdef in self.refDefs():
+            self.refLoad(parent, pdef, key, lazy=lazy)
             pass
         pass
 
-    def refLoad(self, parent, pdef, key):
+    def refLoad(self, parent, pdef, key, lazy=False):
         if key not in parent:
             return
         value = parent[key]
-        ref = pdef.refLoad(parent, key, value)
+        ref = pdef.refLoad(parent, key, value, lazy=lazy)
         if ref is not value:
             parent[key] = ref
             pass
@@ -415,7 +691,10 @@ PD_MaterialChannel = PropDef('MaterialChannel')
 PD_MaterialChannelArray = PropArrayDef('MaterialChannel')
 PD_Presentation = PropDef('Presentation')
 
-class Object(collections.UserDict):
+class Object(collections.abc.MutableMapping):
+    __slots__ = ('parent', 'data', '_instDef', 'idMap', 'assets',
+                 'propIndexes', 'pathMemo')
+
     # map of all Object types indexed by Python class name
     Types = {}
 
@@ -428,9 +707,13 @@ class Object(collections.UserDict):
     # if True, the DSON type property determines which class to construct
     autoType = False
 
+    # incremented whenever an Object's data or instDef changes
+    generation = 0
+
     @classmethod
     def typeRegister(self, cls):
         assert cls.__name__ not in self.Types
+        cls.propDefs.compile()
         self.Types[cls.__name__] = cls
         for typeName in cls.typeNames:
             if typeName in self.TypeNames:
@@ -455,12 +738,94 @@ class Object(collections.UserDict):
     })
 
     def __init__(self, srcData, parent=None):
+        # srcData is not kept, the loaded properties are stored in data
         self.parent = parent
-        self.srcData = srcData
-        self.instDef = None
+        self._instDef = None
         self.data = {}
         self.idMap = None
         self.assets = None
+        # property lookup indexes by exclude list
+        self.propIndexes = None
+        # memoized propFind results by path and exclude list
+        self.pathMemo = None
+        pass
+
+    @property
+    def srcData(self):
+        return srcDataGet(self)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __repr__(self):
+        return repr(self.data)
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def keys(self):
+        return self.data.keys()
+
+    def items(self):
+        return self.data.items()
+
+    def values(self):
+        return self.data.values()
+
+    @property
+    def instDef(self):
+        instDef = self._instDef
+        if isinstance(instDef, Ref):
+            # a deferred reference
+            instDef = self._instDef = instDef.obj
+            pass
+        return instDef
+
+    @instDef.setter
+    def instDef(self, instDef):
+        self._instDef = instDef
+        Object.generation += 1
+        pass
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.propIndexReset()
+        Object.generation += 1
+        pass
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.propIndexReset()
+        Object.generation += 1
+        pass
+
+    def propIndex(self, exclude=None):
+        key = propIndexKey(exclude)
+        if self.propIndexes is None:
+            self.propIndexes = {}
+            pass
+        index = self.propIndexes.get(key)
+        if index is None:
+            index = self.propIndexes[key] = propIndexBuild(self, exclude)
+            pass
+        return index
+
+    def propIndexReset(self):
+        # the indexes of the ancestors include this object's properties
+        obj = self
+        while obj is not None and obj.propIndexes is not None:
+            obj.propIndexes = None
+            obj = obj.parent
+            pass
         pass
 
     def isA(self, cls):
@@ -510,8 +875,8 @@ class Object(collections.UserDict):
             pass
         return None
 
-    def idIndex(self):
-        id = self.srcData.get('id')
+    def idIndex(self, srcData):
+        id = srcData.get('id')
         if id is not None:
             root = self.idRootGet()
             if root is not None:
@@ -532,9 +897,12 @@ class Object(collections.UserDict):
     def idFind(self, id):
         root = self.idRootGet()
         if root is not None:
-            return root.idMap.get(id)
+            return root.idLookup(id)
         return None
 
+    def idLookup(self, id):
+        return self.idMap.get(id)
+
     def idGet(self, id):
         obj = self.idFind(id)
         if obj is None:
@@ -547,28 +915,93 @@ class Object(collections.UserDict):
         return obj
 
     def propFind(self, *targetIds, defValue=None, exclude=None):
-        return pathFind(self, targetIds, defValue=defValue, exclude=exclude)
+        pval = self.pathMemoFind(targetIds, exclude)
+        if pval is None:
+            return defValue
+        return pval
 
     def propGet(self, *targetIds, defValue=None, exclude=None):
-        return pathGet(self, targetIds, defValue=defValue, exclude=exclude)
+        pval = self.pathMemoFind(targetIds, exclude)
+        if pval is None:
+            # report the error
+            return pathGet(self, targetIds, defValue=defValue, exclude=exclude)
+        return pval
+
+    def pathMemoFind(self, path, exclude=None):
+        # A path can lead through refs and instDefs into other objects,
+        # so the results are dropped whenever any Object changes.
+        key = (path, propIndexKey(exclude))
+        if self.pathMemo is None:
+            self.pathMemo = {}
+            pass
+        memo = self.pathMemo.get(key)
+        if memo is not None and memo[0] == Object.generation:
+            utils.stats.count('pathMemo.hit')
+            return memo[1]
+        utils.stats.count('pathMemo.miss')
+        generation = Object.generation
+        pval = pathFind(self, path, exclude=exclude)
+        self.pathMemo[key] = (generation, pval)
+        return pval
 
     def refsLoad(self):
-        for obj in forEach(self):
-            obj.propDefs.refsLoad(obj)
-            obj.refsLoaded()
+        # the time includes loading the referenced files
+        with utils.stats.timer('refsLoad',
+                               path=getattr(self.rootGet(), 'filePath', None)):
+            lazy = getattr(self.rootGet(), 'lazyRefs', False)
+            # lazy library entries load their references when constructed
+            for obj in forEach(self, construct=False):
+                propDefs = obj.propDefs
+                if propDefs.refDefs():
+                    propDefs.refsLoad(obj, lazy=lazy)
+                    pass
+                obj.refsLoaded()
+                pass
             pass
         pass
 
     def refsLoaded(self):
         pass
 
+    def refResolved(self, key, target):
+        # called when the reference of property key resolves to target
+        pass
+
+    def columnId(self):
+        return self.get('id')
+
+    def columnGet(self, name):
+        # return the sidecar column of this object or None
+        sidecar = getattr(self.rootGet(), 'sidecar', None)
+        if sidecar is None:
+            return None
+        return sidecar.column(self.columnId(), name)
+
+    def refURLs(self):
+        # yield the urls of the unresolved references in the tree
+        for obj in forEach(self, construct=False):
+            for key, pdef in obj.propDefs.refDefs():
+                value = obj.get(key)
+                if isinstance(value, str):
+                    yield value
+                elif isinstance(value, list):
+                    for child in value:
+                        if isinstance(child, str):
+                            yield child
+                            pass
+                        pass
+                    pass
+                pass
+            pass
+        pass
+
     def __str__(self):
         return objName(self)
 
     @classmethod
-    def load(self, srcData, parent=None):
+    def load(self, srcData, parent=None, **kwargs):
         cls = self.loadCls(srcData)
-        obj = cls(srcData, parent=parent)
+        obj = cls(srcData, parent=parent, **kwargs)
         data = obj.data
         if not isinstance(srcData, dict):
             raise Exception("using invalid value \"{}\" to construct {}".format(
@@ -599,22 +1032,226 @@ class Object(collections.UserDict):
 
 @Object.typeRegister
 class DAZ(Object):
+    __slots__ = ('path', 'filePath', 'asset_info', 'sidecar',
+                 'lazyIds', 'lazyLock', 'lazyRefs', 'referrerMap',
+                 'deferredRefs', 'lazyChildren')
+
     propDefs = PropDefs(Object.propDefs, {
         'file_version': PD_Value,
         'asset_info': PD_Value,
-        'geometry_library': PropArrayDef('Geometry'),
-        'node_library': PropArrayDef('Node'),
-        'uv_set_library': PropArrayDef('UVSet'),
-        'modifier_library': PropArrayDef('Modifier'),
-        'image_library': PropArrayDef('Image'),
-        'material_library': PropArrayDef('Material'),
+        'geometry_library': PropLibraryDef('Geometry'),
+        'node_library': PropLibraryDef('Node'),
+        'uv_set_library': PropLibraryDef('UVSet'),
+        'modifier_library': PropLibraryDef('Modifier'),
+        'image_library': PropLibraryDef('Image'),
+        'material_library': PropLibraryDef('Material'),
         'scene': PropDef('Scene')
     })
 
-    def __init__(self, srcData, parent=None):
+    def __init__(self, srcData, parent=None, lazy=False, lazyRefs=False):
         Object.__init__(self, srcData, parent=parent)
         self.idMap = {}
+        # constructed assets, see librariesLoad
         self.assets = []
+        self.path = None
+        self.filePath = None
+        self.asset_info = None
+        self.sidecar = None
+        # if lazy, the library entries are constructed on first access
+        # and lazyIds maps the ids of the others to (library, index)
+        self.lazyIds = {} if lazy else None
+        self.lazyLock = threading.RLock() if lazy else None
+        # the unconstructed library entries by parent (path, id):
+        # (path, id) -> [(library, index), ...], see childEntriesLoad
+        self.lazyChildren = None
+        # if lazyRefs, Ref.obj is resolved on first access and the errors
+        # of unresolvable references are raised there
+        self.lazyRefs = lazyRefs
+        # resolved references of this file's objects by target:
+        # id(target) -> (target, [(source, key), ...])
+        # deferred references are added when they are resolved
+        self.referrerMap = {}
+        # deferred references by target (path, id), they are resolved
+        # when the target's referrers or children are needed
+        self.deferredRefs = {}
+        pass
+
+    def referrerAdd(self, source, key, target):
+        entry = self.referrerMap.get(id(target))
+        if entry is None:
+            entry = self.referrerMap[id(target)] = (target, [])
+            pass
+        entry[1].append((source, key))
+        pass
+
+    def referrers(self, target, key=None):
+        # the (source, key) references of this file's objects to target
+        if self.deferredRefs and isinstance(target, Object):
+            self.deferredRefsResolve(targetKey(target), key)
+            pass
+        entry = self.referrerMap.get(id(target))
+        if entry is None:
+            return []
+        if key is None:
+            return list(entry[1])
+        return [ref for ref in entry[1] if ref[1] == key]
+
+    def idLookup(self, id):
+        obj = self.idMap.get(id)
+        if obj is None and self.lazyIds:
+            entry = self.lazyIds.get(id)
+            if entry is not None:
+                library, index = entry
+                obj = library.entryLoad(index)
+                pass
+            pass
+        return obj
+
+    def propsAdd(self, srcData):
+        # construct the properties of srcData that aren't loaded (eg, the
+        # libraries of a richer load profile) and load their references;
+        # the properties are only added if all references resolve
+        keys = [key for key in sorted(srcData.keys()) if key not in self]
+        idMap = dict(self.idMap)
+        assets = len(self.assets)
+        lazyIds = None if self.lazyIds is None else dict(self.lazyIds)
+        values = {}
+        objs = []
+        try:
+            for key in keys:
+                values[key] = self.propDefs.load(self, key, srcData[key])
+                pass
+            with utils.stats.timer('refsLoad', path=self.filePath):
+                for key in keys:
+                    for obj in forEach(values[key], allowLists=True,
+                                       construct=False):
+                        objs.append(obj)
+                        propDefs = obj.propDefs
+                        if propDefs.refDefs():
+                            propDefs.refsLoad(obj, lazy=self.lazyRefs)
+                            pass
+                        obj.refsLoaded()
+                        pass
+                    pass
+                pass
+        except BaseException:
+            self.propsRollback(objs, idMap, assets, lazyIds)
+            raise
+        for key in keys:
+            self[key] = values[key]
+            pass
+        # index the new libraries too
+        self.lazyChildren = None
+        return keys
+
+    def propsRollback(self, objs, idMap, assets, lazyIds):
+        # forget the objects constructed by a failed propsAdd
+        self.idMap.clear()
+        self.idMap.update(idMap)
+        del self.assets[assets:]
+        if lazyIds is not None:
+            self.lazyIds.clear()
+            self.lazyIds.update(lazyIds)
+            pass
+        removed = set(id(obj) for obj in objs)
+        for obj in objs:
+            parentRef = obj.get('parent')
+            if (isinstance(obj, (Node, NodeInstance)) and
+                isinstance(parentRef, Ref) and not parentRef.isDeferred()):
+                parent = parentRef.target
+                if isinstance(parent, (Node, NodeInstance)):
+                    parent.childList[:] = [
+                        child for child in parent.childList
+                        if child is not obj
+                    ]
+                    pass
+                pass
+            pass
+        for key, (target, refs) in list(self.referrerMap.items()):
+            refs[:] = [ref for ref in refs if id(ref[0]) not in removed]
+            if not refs:
+                del self.referrerMap[key]
+                pass
+            pass
+        for key, refs in list(self.deferredRefs.items()):
+            refs[:] = [ref for ref in refs if id(ref.parent) not in removed]
+            if not refs:
+                del self.deferredRefs[key]
+                pass
+            pass
+        pass
+
+    def deferredRefAdd(self, ref):
+        key = ref.targetKey()
+        refs = self.deferredRefs.get(key)
+        if refs is None:
+            refs = self.deferredRefs[key] = []
+            pass
+        refs.append(ref)
+        pass
+
+    def deferredRefsResolve(self, target, key=None):
+        # resolve the deferred references of property key (or any) to
+        # target (path, id), which records them as its referrers
+        refs = [ref for ref in self.deferredRefs.pop(target, ())
+                if ref.isDeferred()]
+        resolve = [ref for ref in refs if key is None or ref.key == key]
+        rest = [ref for ref in refs if key is not None and ref.key != key]
+        if rest:
+            self.deferredRefs[target] = rest
+            pass
+        try:
+            for ref in resolve:
+                ref.obj
+                pass
+        finally:
+            # keep the ones left by an error
+            rest = [ref for ref in resolve if ref.isDeferred()]
+            if rest:
+                self.deferredRefs.setdefault(target, []).extend(rest)
+                pass
+            pass
+        pass
+
+    def childEntriesLoad(self, target):
+        # construct the lazy library entries whose parent reference is
+        # to target (path, id), which adds them to its children
+        with self.lazyLock:
+            if self.lazyChildren is None:
+                self.lazyChildren = {}
+                for value in self.values():
+                    # only nodes are children
+                    if not (isinstance(value, LibraryList) and
+                            issubclass(value.cls, Node)):
+                        continue
+                    for index, entry in enumerate(value.entries()):
+                        parent = None
+                        if isinstance(entry, dict):
+                            parent = entry.get('parent')
+                            pass
+                        if isinstance(parent, str):
+                            key = urlTargetKey(parent, self.path)
+                            self.lazyChildren.setdefault(key, []).append(
+                                (value, index))
+                            pass
+                        pass
+                    pass
+                pass
+            entries = self.lazyChildren.pop(target, ())
+            pass
+        for library, index in entries:
+            library.entryLoad(index)
+            pass
+        pass
+
+    def librariesLoad(self):
+        # construct all lazy library entries
+        for value in self.values():
+            if isinstance(value, LibraryList):
+                for obj in value:
+                    pass
+                pass
+            pass
         pass
 
     def refsLoaded(self):
@@ -624,11 +1261,13 @@ class DAZ(Object):
 
 @Object.typeRegister
 class CameraOrthographic(Object):
-    propDefs = [Object.propDefs, {
+    __slots__ = ()
+
+    propDefs = PropDefs(Object.propDefs, {
         'znear': PD_Value,
         'zfar': PD_Value,
         'ymag': PD_Value
-    }]
+    })
 
     def __init__(self, srcData, parent=None):
         Object.__init__(self, srcData, parent=parent)
@@ -637,6 +1276,8 @@ class CameraOrthographic(Object):
 
 @Object.typeRegister
 class CameraPerspective(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(Object.propDefs, {
         'znear': PD_Value,
         'zfar': PD_Value,
@@ -654,6 +1295,8 @@ class CameraPerspective(Object):
 
 @Object.typeRegister
 class Channel(Object):
+    __slots__ = ()
+
     autoType = True
 
     propDefs = PropDefs(Object.propDefs, {
@@ -701,6 +1344,8 @@ class Channel(Object):
 
 @Object.typeRegister
 class ChannelBase(Channel):
+    __slots__ = ()
+
     propDefs = PropDefs(Channel.propDefs, {
         'value': PD_Value,
         'current_value': PD_Value,
@@ -717,6 +1362,8 @@ class ChannelBase(Channel):
 
 @Object.typeRegister
 class ChannelBaseMinMax(ChannelBase):
+    __slots__ = ()
+
     propDefs = PropDefs(ChannelBase.propDefs, {
         'min': PD_Value,
         'max': PD_Value,
@@ -732,6 +1379,8 @@ class ChannelBaseMinMax(ChannelBase):
 
 @Object.typeRegister
 class ChannelAlias(Channel):
+    __slots__ = ('target_channel',)
+
     typeNames = ['alias']
 
     propDefs = PropDefs(Channel.propDefs, {
@@ -746,6 +1395,8 @@ class ChannelAlias(Channel):
 
 @Object.typeRegister
 class ChannelAnimation(Object):
+    __slots__ = ('channel',)
+
     propDefs = PropDefs(Object.propDefs, {
         'url': PD_Ref,
         'keys': PD_Value
@@ -755,10 +1406,22 @@ class ChannelAnimation(Object):
         Object.__init__(self, srcData, parent=parent)
         self.channel = None
         pass
+
+    def channelGet(self):
+        # the animated channel of a scene node or None
+        if self.channel is None:
+            url = self.get('url')
+            self.channel = animation.targetFind(
+                self.parent, getattr(url, 'url', url)
+            )
+            pass
+        return self.channel
     pass
 
 @Object.typeRegister
 class ChannelBool(ChannelBaseMinMax):
+    __slots__ = ()
+
     typeNames = ['bool']
 
     def __init__(self, srcData, parent=None):
@@ -768,6 +1431,8 @@ class ChannelBool(ChannelBaseMinMax):
 
 @Object.typeRegister
 class ChannelColor(ChannelBaseMinMax):
+    __slots__ = ()
+
     typeNames = ['color', 'float_color']
 
     def __init__(self, srcData, parent=None):
@@ -777,6 +1442,8 @@ class ChannelColor(ChannelBaseMinMax):
 
 @Object.typeRegister
 class ChannelEnum(Channel):
+    __slots__ = ()
+
     typeNames = ['enum']
 
     propDefs = PropDefs(Channel.propDefs, {
@@ -791,6 +1458,8 @@ class ChannelEnum(Channel):
 
 @Object.typeRegister
 class ChannelFloat(ChannelBaseMinMax):
+    __slots__ = ()
+
     typeNames = ['float']
 
     propDefs = PropDefs(ChannelBaseMinMax.propDefs, {
@@ -804,6 +1473,8 @@ class ChannelFloat(ChannelBaseMinMax):
 
 @Object.typeRegister
 class ChannelImage(ChannelBase):
+    __slots__ = ()
+
     typeNames = ['image']
 
     def __init__(self, srcData, parent=None):
@@ -813,6 +1484,8 @@ class ChannelImage(ChannelBase):
 
 @Object.typeRegister
 class ChannelInt(ChannelBaseMinMax):
+    __slots__ = ()
+
     typeNames = ['int']
 
     def __init__(self, srcData, parent=None):
@@ -822,6 +1495,8 @@ class ChannelInt(ChannelBaseMinMax):
 
 @Object.typeRegister
 class ChannelString(ChannelBase):
+    __slots__ = ()
+
     typeNames = ['string']
 
     def __init__(self, srcData, parent=None):
@@ -831,6 +1506,8 @@ class ChannelString(ChannelBase):
 
 @Object.typeRegister
 class Extra(Object):
+    __slots__ = ()
+
     propDefs = PropDefsAny()
 
     def __init__(self, srcData, parent=None):
@@ -840,6 +1517,8 @@ class Extra(Object):
 
 @Object.typeRegister
 class Formula(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(Object.propDefs, {
         'output': PD_Value,
         'stage': PD_Value,
@@ -853,6 +1532,8 @@ class Formula(Object):
     
 @Object.typeRegister
 class Geometry(Object):
+    __slots__ = ('default_uv_set', 'arrayView')
+
     propDefs = PropDefs(Object.propDefs, {
         'id': PD_Value,
         'name': PD_Value,
@@ -872,13 +1553,23 @@ class Geometry(Object):
 
     def __init__(self, srcData, parent=None):
         Object.__init__(self, srcData, parent=parent)
-        self.idIndex()
+        self.idIndex(srcData)
         self.default_uv_set = None
+        self.arrayView = None
         pass
+
+    def arrays(self):
+        # NumPy view of the vertices and polygons (requires numpy)
+        if self.arrayView is None:
+            self.arrayView = arrays.GeometryArrays(self)
+            pass
+        return self.arrayView
     pass
 
 @Object.typeRegister
 class GeometryInstance(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(Geometry.propDefs, {
         'url': PD_InstDef,
         # undocumented
@@ -888,12 +1579,14 @@ class GeometryInstance(Object):
 
     def __init__(self, srcData, parent=None):
         Object.__init__(self, srcData, parent=parent)
-        self.idIndex()
+        self.idIndex(srcData)
         pass
     pass
     
 @Object.typeRegister
 class Graft(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(Object.propDefs, {
         'vertex_count': PD_Value,
         'poly_count': PD_Value,
@@ -908,6 +1601,8 @@ class Graft(Object):
 
 @Object.typeRegister
 class Image(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(Object.propDefs, {
         'id': PD_Value,
         'name': PD_Value,
@@ -919,7 +1614,7 @@ class Image(Object):
 
     def __init__(self, srcData, parent=None):
         Object.__init__(self, srcData, parent=parent)
-        self.idIndex()
+        self.idIndex(srcData)
         pass
 
     def loadProperty(self, key, value):
@@ -935,6 +1630,8 @@ class Image(Object):
 
 @Object.typeRegister
 class ImageMap(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(Object.propDefs, {
         'url': PD_Value,
         'label': PD_Value,
@@ -958,6 +1655,8 @@ class ImageMap(Object):
 
 @Object.typeRegister
 class MaterialChannel(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(Object.propDefs, {
         'channel': PD_Channel,
         'group': PD_Value,
@@ -975,6 +1674,8 @@ class MaterialChannel(Object):
 
 @Object.typeRegister
 class Material(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(Object.propDefs, {
         'id': PD_Value,
         'name': PD_Value,
@@ -1010,12 +1711,14 @@ class Material(Object):
 
     def __init__(self, srcData, parent=None):
         Object.__init__(self, srcData, parent=parent)
-        self.idIndex()
+        self.idIndex(srcData)
         pass
     pass
 
 @Object.typeRegister
 class MaterialInstance(Object):
+    __slots__ = ('geometry',)
+
     propDefs = PropDefs(Material.propDefs, {
         'parent': PD_Ref,
         'geometry': PD_Ref,
@@ -1025,13 +1728,15 @@ class MaterialInstance(Object):
 
     def __init__(self, srcData, parent=None):
         Object.__init__(self, srcData, parent=parent)
-        self.idIndex()
+        self.idIndex(srcData)
         self.geometry = None
         pass
     pass
 
 @Object.typeRegister
 class Modifier(Object):
+    __slots__ = ('parentModifier',)
+
     propDefs = PropDefs(Object.propDefs, {
         'id': PD_Value,
         'name': PD_Value,
@@ -1049,26 +1754,30 @@ class Modifier(Object):
 
     def __init__(self, srcData, parent=None):
         Object.__init__(self, srcData, parent=parent)
-        self.idIndex()
+        self.idIndex(srcData)
         self.parentModifier = None
         pass
     pass
 
 @Object.typeRegister
 class ModifierInstance(Object):
+    __slots__ = ('parentNode',)
+
     propDefs = PropDefs(Modifier.propDefs, {
         'url': PD_InstDef
     })
 
     def __init__(self, srcData, parent=None):
         Object.__init__(self, srcData, parent=parent)
-        self.idIndex()
+        self.idIndex(srcData)
         self.parentNode = None
         pass
     pass
 
 @Object.typeRegister
 class Morph(Object):
+    __slots__ = ('arrayView',)
+
     propDefs = PropDefs(Modifier.propDefs, {
         'vertex_count': PD_Value,
         'deltas': PD_Array,
@@ -1078,11 +1787,53 @@ class Morph(Object):
 
     def __init__(self, srcData, parent=None):
         Object.__init__(self, srcData, parent=parent)
+        self.arrayView = None
+        pass
+
+    def arrays(self):
+        # NumPy view of the deltas (requires numpy)
+        if self.arrayView is None:
+            self.arrayView = arrays.MorphArrays(self)
+            pass
+        return self.arrayView
+
+    def columnId(self):
+        # morph columns are stored under the modifier id
+        return self.parent.get('id')
+    pass
+
+def childAdd(parent, child):
+    # a node's parent reference resolved to parent
+    if isinstance(parent, (Node, NodeInstance)):
+        parent.childList.append(child)
         pass
     pass
 
+def childrenGet(node):
+    # the nodes whose parent references resolved to node, after
+    # resolving the deferred ones that refer to it
+    root = node.rootGet()
+    key = targetKey(node)
+    roots = [root]
+    for daz in list(reader.cache.cache.values()):
+        if daz is not root:
+            roots.append(daz)
+            pass
+        pass
+    for daz in roots:
+        if isinstance(daz, DAZ) and daz.lazyIds:
+            daz.childEntriesLoad(key)
+            pass
+        if isinstance(daz, DAZ) and daz.deferredRefs:
+            daz.deferredRefsResolve(key, 'parent')
+            pass
+        pass
+    return node.childList
+
 @Object.typeRegister
 class Node(Object):
+    __slots__ = ('childList',)
+
     autoType = True
     typeNames = ['node']
 
@@ -1111,52 +1862,40 @@ class Node(Object):
 
     def __init__(self, srcData, parent=None):
         Object.__init__(self, srcData, parent=parent)
-        self.idIndex()
-        self.children = []
+        self.idIndex(srcData)
+        self.childList = []
         pass
 
-    def refsLoaded(self):
-        parentRef = self.get('parent')
-        if parentRef:
-            parent = parentRef.obj
-            parent.children.append(self)
+    @property
+    def children(self):
+        return childrenGet(self)
+
+    def refResolved(self, key, target):
+        if key == 'parent':
+            childAdd(target, self)
             pass
         pass
 
     def globalTransform(self):
-        # TBD
-        # http://docs.daz3d.com/doku.php/public/dson_spec/object_definitions/node/start
-
-        # The translation, rotation, scale, and general_scale elements
-        # each represent transforms that convert to transform matrices.
-        # To arrive at the full base transform for the node, each of those
-        # elements is converted to matrix form.
-        # The full transform for a node is determined using the following algorithm:
-        center_offset = center_point - parent.center_point
-        global_translation = parent.global_transform * (center_offset + translation)
-        global_rotation = parent.global_rotation * orientation * rotation * inv(orientation)
-        if inherits_scale:
-            global_scale = parent.global_scale * orientation * scale * general_scale * inv(orientation)
-        else:
-            global_scale = parent.global_scale * inv(parent.local_scale) * orientation * scale * general_scale * inv(orientation)
+        # 4x4 world transform of the node's current pose,
+        # use a transforms.TransformEngine to evaluate many nodes
+        root = self
+        while True:
+            parentRef = root.get('parent')
+            if not isinstance(parentRef, Ref):
+                break
+            if not isinstance(parentRef.obj, Node):
+                break
+            root = parentRef.obj
             pass
-        global_transform = global_translation * global_rotation * global_scale
-
-        # Vertices are taken to global space by post-multiplying as follows:
-        global_vertex = global_transform * vertex
-
-        center_point = self['center_point']
-        parent_center_point = self['parent'].obj['center_point']
-        center_offset = vec3.sub(center_point, parent_center_point)
-
-        translation = self['translation']
-        
-        pass
+        return transforms.TransformEngine(root).worldGet(self)
 
     pass
 
 @Object.typeRegister
 class NodeInstance(Object):
+    __slots__ = ('parent_in_place', 'conform_target', 'childList')
+
     propDefs = PropDefs(Node.propDefs, {
         'url': PD_InstDef,
         'parent_in_place': PD_Ref,
@@ -1167,25 +1906,27 @@ class NodeInstance(Object):
 
     def __init__(self, srcData, parent=None):
         Object.__init__(self, srcData, parent=parent)
-        self.idIndex()
+        self.idIndex(srcData)
         self.parent_in_place = None
         self.conform_target = None
-        self.children = []
+        self.childList = []
         pass
 
-    def refsLoaded(self):
-        parentRef = self.get('parent')
-        if parentRef:
-            parent = parentRef.obj
-            if isinstance(parent, Object):
-                parent.children.append(self)
-                pass
+    @property
+    def children(self):
+        return childrenGet(self)
+
+    def refResolved(self, key, target):
+        if key == 'parent':
+            childAdd(target, self)
             pass
         pass
     pass
 
 @Object.typeRegister
 class Bone(Node):
+    __slots__ = ()
+
     typeNames = ['bone']
 
     def __init__(self, srcData, parent=None):
@@ -1195,6 +1936,8 @@ class Bone(Node):
 
 @Object.typeRegister
 class Camera(Node):
+    __slots__ = ()
+
     typeNames = ['camera']
 
     propDefs = PropDefs(Node.propDefs, {
@@ -1209,6 +1952,8 @@ class Camera(Node):
 
 @Object.typeRegister
 class Figure(Node):
+    __slots__ = ()
+
     typeNames = ['figure']
 
     def __init__(self, srcData, parent=None):
@@ -1218,6 +1963,8 @@ class Figure(Node):
 
 @Object.typeRegister
 class Light(Node):
+    __slots__ = ()
+
     typeNames = ['light']
 
     propDefs = PropDefs(Node.propDefs, {
@@ -1235,6 +1982,8 @@ class Light(Node):
 
 @Object.typeRegister
 class LightDirectional(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(Object.propDefs, {
         'intensity': PD_Value,
         'shadow_type': PD_Value,
@@ -1243,12 +1992,14 @@ class LightDirectional(Object):
     })
 
     def __init__(self, srcData, parent=None):
-        Node.__init__(self, srcData, parent=parent)
+        Object.__init__(self, srcData, parent=parent)
         pass
     pass
 
 @Object.typeRegister
 class LightPoint(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(LightDirectional.propDefs, {
         'constant_attenuation': PD_Value,
         'linear_attenuation': PD_Value,
@@ -1256,7 +2007,7 @@ class LightPoint(Object):
     })
 
     def __init__(self, srcData, parent=None):
-        Node.__init__(self, srcData, parent=parent)
+        Object.__init__(self, srcData, parent=parent)
         pass
 
     def colorScaling(self, Dist):
@@ -1272,13 +2023,15 @@ class LightPoint(Object):
 
 @Object.typeRegister
 class LightSpot(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(LightPoint.propDefs, {
         'falloff_angle': PD_Value,
         'falloff_exponent': PD_Value
     })
 
     def __init__(self, srcData, parent=None):
-        Node.__init__(self, srcData, parent=parent)
+        Object.__init__(self, srcData, parent=parent)
         pass
 
     def colorScaling(self, Dist):
@@ -1297,6 +2050,8 @@ class LightSpot(Object):
 
 @Object.typeRegister
 class Operation(Object):
+    __slots__ = ('propRef',)
+
     propDefs = PropDefs(Object.propDefs, {
         'op': PD_Value,
         'val': PD_Value,
@@ -1313,6 +2068,8 @@ class Operation(Object):
 
 @Object.typeRegister
 class Presentation(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(Object.propDefs, {
         'type': PD_Value,
         'label': PD_Value,
@@ -1332,6 +2089,8 @@ class Presentation(Object):
 
 @Object.typeRegister
 class Preview(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(Object.propDefs, {
         'oriented_box': PD_Value,
         'center_point': PD_Value,
@@ -1348,6 +2107,8 @@ class Preview(Object):
     
 @Object.typeRegister
 class Region(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(Object.propDefs, {
         'id': PD_Value,
         'label': PD_Value,
@@ -1363,6 +2124,8 @@ class Region(Object):
     
 @Object.typeRegister
 class Rigidity(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(Object.propDefs, {
         'weights': PD_Array,
         'groups': PropArrayDef('RigidityGroup')
@@ -1375,6 +2138,8 @@ class Rigidity(Object):
     
 @Object.typeRegister
 class RigidityGroup(Object):
+    __slots__ = ('transform_nodes',)
+
     propDefs = PropDefs(Object.propDefs, {
         'id': PD_Value,
         'rotation_mode': PD_Value,
@@ -1393,6 +2158,8 @@ class RigidityGroup(Object):
 
 @Object.typeRegister
 class Scene(Object):
+    __slots__ = ('current_camera',)
+
     propDefs = PropDefs(Object.propDefs, {
         'presentation': PD_Presentation,
         'nodes': PropArrayDef('NodeInstance'),
@@ -1411,6 +2178,8 @@ class Scene(Object):
 
 @Object.typeRegister
 class SkinBinding(Object):
+    __slots__ = ('node', 'geometry', 'arrayView')
+
     propDefs = PropDefs(Object.propDefs, {
         'node': PD_Ref,
         'geometry': PD_Ref,
@@ -1425,11 +2194,21 @@ class SkinBinding(Object):
         Object.__init__(self, srcData, parent=parent)
         self.node = None
         self.geometry = None
+        self.arrayView = None
         pass
+
+    def arrays(self):
+        # NumPy view of the joint weights (requires numpy)
+        if self.arrayView is None:
+            self.arrayView = arrays.SkinArrays(self)
+            pass
+        return self.arrayView
     pass
 
 @Object.typeRegister
 class WeightedJoint(Object):
+    __slots__ = ('node',)
+
     propDefs = PropDefs(Object.propDefs, {
         'id': PD_Value,
         'node': PD_Ref,
@@ -1448,6 +2227,8 @@ class WeightedJoint(Object):
 
 @Object.typeRegister
 class UVSet(Object):
+    __slots__ = ('arrayView',)
+
     propDefs = PropDefs(Object.propDefs, {
         'id': PD_Value,
         'label': PD_Value,
@@ -1459,12 +2240,22 @@ class UVSet(Object):
 
     def __init__(self, srcData, parent=None):
         Object.__init__(self, srcData, parent=parent)
-        self.idIndex()
+        self.idIndex(srcData)
+        self.arrayView = None
         pass
+
+    def arrays(self):
+        # NumPy view of the uvs and polygon vertex indices (requires numpy)
+        if self.arrayView is None:
+            self.arrayView = arrays.UVSetArrays(self)
+            pass
+        return self.arrayView
     pass
 
 @Object.typeRegister
 class UVSetInstance(Object):
+    __slots__ = ()
+
     propDefs = PropDefs(UVSet.propDefs, {
         'url': PD_InstDef,
         'parent': PD_Ref
@@ -1472,6 +2263,6 @@ class UVSetInstance(Object):
 
     def __init__(self, srcData, parent=None):
         Object.__init__(self, srcData, parent=parent)
-        self.idIndex()
+        self.idIndex(srcData)
         pass
     pass
@@ -1,4 +1,11 @@
+import atexit
+import contextlib
+import functools
 import json
+import os
+import sys
+import threading
+import time
 import urllib
 import urllib.parse
 
@@ -6,72 +13,268 @@ from . import types
 
 verbose = 0
 
+# number of parsed URLs kept by URL
+URL_CACHE_SIZE = 65536
+
 class URL:
-    """[ scheme :/ ] node_path : file_path # asset_id ? property_path"""
+    """[ scheme :/ ] node_path : file_path # asset_id ? property_path
+
+    URLs are immutable and shared: URL(url) returns the cached parse of
+    the url string (see urlParse), and propPath is a tuple.
+    """
+
+    __slots__ = ('url', 'scheme', 'netloc', 'path', 'fragment', 'propPath')
 
-    def __init__(self, url):
-        self.url = url
+    def __new__(cls, url):
+        if isinstance(url, URL):
+            return url
+        return urlParse(url)
+
+    @classmethod
+    def parse(cls, url):
+        # parse url without the cache
         u = urllib.parse.urlparse(url)
-        self.scheme = u.scheme
-        self.netloc = u.netloc
-        self.path = urllib.parse.unquote(u.path)
-        self.fragment = u.fragment
+        scheme = u.scheme
+        netloc = u.netloc
+        path = urllib.parse.unquote(u.path)
+        fragment = u.fragment
 
-        if not self.scheme and self.path:
-            idx = self.path.find(':')
+        if not scheme and path:
+            idx = path.find(':')
             if idx >= 0:
-                self.scheme = self.path[:idx]
-                self.path = self.path[idx+1:]
+                scheme = path[:idx]
+                path = path[idx+1:]
                 pass
             pass
 
         # fixup name://@selection URLs
-        if self.netloc == '@selection:':
+        if netloc == '@selection:':
             # if url is 'name://@selection:?scale/x/value'
             # then netloc is '@selection:'
             # so need to trim off the trailing ':'
-            self.netloc = self.netloc[:-1]
+            netloc = netloc[:-1]
             pass
-        if self.netloc == '@selection':
-            if self.path and self.path[-1] == ':':
+        if netloc == '@selection':
+            if path and path[-1] == ':':
                 # if url is 'name://@selection/path:?translation/x/value'
                 # then path is 'path:'
                 # so need to trim off the trailing ':'
-                self.path = self.path[:-1]
+                path = path[:-1]
                 pass
             pass
 
-        self.propPath = None
-        if self.scheme:
+        propPath = None
+        if scheme:
             # note: urlparse lowercases the scheme so re-extract it
             # from the url
-            self.scheme = url[:url.find(':')]
+            scheme = url[:url.find(':')]
             pass
-        if self.path:
-            self.path = urllib.parse.unquote(self.path)
+        if path:
+            path = urllib.parse.unquote(path)
             pass
-        if self.fragment:
+        if fragment:
             idx = u.fragment.find('?')
             if idx >= 0:
-                self.fragment = u.fragment[:idx]
-                if self.netloc == '@selection' and self.fragment[-1] == ':':
+                fragment = u.fragment[:idx]
+                if netloc == '@selection' and fragment[-1] == ':':
                     # if url is 'name://@selection#fragment:?value/value'
                     # then fragment is 'fragment:?value/value'
                     # so need to trim off the trailing ':'
-                    self.fragment = self.fragment[:-1]
+                    fragment = fragment[:-1]
                     pass
-                self.propPath = u.fragment[idx+1:].split('/')
+                propPath = tuple(u.fragment[idx+1:].split('/'))
                 pass
-            self.fragment = urllib.parse.unquote(self.fragment)
+            fragment = urllib.parse.unquote(fragment)
             pass
-        if self.propPath is None and u.query:
-            self.propPath = u.query.split('/')
+        if propPath is None and u.query:
+            propPath = tuple(u.query.split('/'))
             pass
-        pass
+
+        self = object.__new__(cls)
+        setattr = object.__setattr__
+        setattr(self, 'url', url)
+        setattr(self, 'scheme', scheme)
+        setattr(self, 'netloc', netloc)
+        setattr(self, 'path', path)
+        setattr(self, 'fragment', fragment)
+        setattr(self, 'propPath', propPath)
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError("URL {} is immutable".format(self.url))
+
+    def __delattr__(self, name):
+        raise AttributeError("URL {} is immutable".format(self.url))
+
+    def __eq__(self, other):
+        if isinstance(other, URL):
+            return self.url == other.url
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.url)
+
+    def __reduce__(self):
+        return (URL, (self.url,))
+
     def __repr__(self):
         return self.url
     pass
 
+# bounded cache of parsed URLs by url string; the same urls recur for
+# every reference into a figure's files
+urlParse = functools.lru_cache(maxsize=URL_CACHE_SIZE)(URL.parse)
+
+class LazyArray:
+    """JSON array text that is decoded on first access"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.values = None
+        pass
+
+    def materialize(self):
+        if self.values is None:
+            self.values = json.loads(self.raw)
+            self.raw = None
+            pass
+        return self.values
+
+    def __len__(self):
+        return len(self.materialize())
+
+    def __getitem__(self, index):
+        return self.materialize()[index]
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __repr__(self):
+        if self.values is None:
+            return "LazyArray({} bytes)".format(len(self.raw))
+        return repr(self.values)
+    pass
+
+def jsonDefault(obj):
+    if isinstance(obj, LazyArray):
+        return obj.materialize()
+    raise TypeError(
+        "Object of type {} is not JSON serializable".format(
+            obj.__class__.__name__
+        )
+    )
+
+class Stats:
+    """counters and cumulative phase timings, overall and per file"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+        pass
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.phases = {}
+            self.files = {}
+            pass
+        pass
+
+    def fileGet(self, path):
+        rec = self.files.get(path)
+        if rec is None:
+            rec = self.files[path] = {'counters': {}, 'phases': {}}
+            pass
+        return rec
+
+    def count(self, name, n=1, path=None):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            if path is not None:
+                counters = self.fileGet(path)['counters']
+                counters[name] = counters.get(name, 0) + n
+                pass
+            pass
+        pass
+
+    def add(self, phase, elapsed, path=None):
+        with self.lock:
+            phases = [self.phases]
+            if path is not None:
+                phases.append(self.fileGet(path)['phases'])
+                pass
+            for phaseMap in phases:
+                rec = phaseMap.get(phase)
+                if rec is None:
+                    rec = phaseMap[phase] = {'count': 0, 'time': 0.0}
+                    pass
+                rec['count'] += 1
+                rec['time'] += elapsed
+                pass
+            pass
+        pass
+
+    @contextlib.contextmanager
+    def timer(self, phase, path=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start, path=path)
+            pass
+        pass
+
+    def ratios(self):
+        # hit rate of each name.hit / name.miss counter pair
+        ratios = {}
+        for name, hits in self.counters.items():
+            if name.endswith('.hit'):
+                base = name[:-len('.hit')]
+                total = hits + self.counters.get(base + '.miss', 0)
+                ratios[base] = hits / total if total else 0.0
+                pass
+            pass
+        return ratios
+
+    def asDict(self):
+        with self.lock:
+            return json.loads(json.dumps({
+                'counters': self.counters,
+                'ratios': self.ratios(),
+                'phases': self.phases,
+                'files': self.files
+            }))
+
+    def dump(self, fp=None):
+        if fp is None:
+            fp = sys.stderr
+            pass
+        json.dump(self.asDict(), fp, indent=2, sort_keys=True)
+        fp.write("\n")
+        pass
+
+    def dumpFile(self, path):
+        with open(path, 'w') as fp:
+            self.dump(fp)
+            pass
+        pass
+
+    def dumpAtExit(self, path=None):
+        if path is None:
+            atexit.register(self.dump)
+        else:
+            atexit.register(self.dumpFile, path)
+            pass
+        pass
+    pass
+
+# instrumentation of the dson modules
+stats = Stats()
+
+if os.environ.get('DSON_STATS'):
+    stats.dumpAtExit(os.environ['DSON_STATS'])
+    pass
+
 def toJSON(obj, **kwargs):
     if 'indent' not in kwargs:
         kwargs['indent'] = 2
@@ -79,6 +282,9 @@ def toJSON(obj, **kwargs):
     if 'sort_keys' not in kwargs:
         kwargs['sort_keys'] = True
         pass
+    if 'default' not in kwargs:
+        kwargs['default'] = jsonDefault
+        pass
     if isinstance(obj, types.Object):
         obj = obj.srcData
         pass
@@ -88,6 +294,9 @@ def outputJSON(fp, obj, **kwargs):
     if 'sort_keys' not in kwargs:
         kwargs['sort_keys'] = True
         pass
+    if 'default' not in kwargs:
+        kwargs['default'] = jsonDefault
+        pass
     if isinstance(obj, types.Object):
         obj = obj.srcData
         pass
@@ -102,8 +311,45 @@ def pp(obj, fp=None):
 def ppDefault(obj):
     if isinstance(obj, types.Object):
         return obj.srcData
+    if isinstance(obj, LazyArray):
+        return obj.materialize()
     return str(obj)
 
+def sizeOf(obj):
+    # approximate the memory used by parsed JSON data or loaded objects
+    size = 0
+    seen = set()
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, types.Object):
+            # count the loaded properties
+            obj = obj.data
+            pass
+        if isinstance(obj, (dict, list)):
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            else:
+                # without constructing lazy library entries
+                stack.extend(list.__iter__(obj))
+                pass
+            pass
+        elif isinstance(obj, LazyArray):
+            # the raw JSON text until it is decoded
+            if obj.raw is not None:
+                size += sys.getsizeof(obj.raw)
+            else:
+                stack.append(obj.values)
+                pass
+            pass
+        size += sys.getsizeof(obj)
+        pass
+    return size
+
 def copyv(vec):
     return [x for x in vec]
 
@@ -310,31 +310,27 @@ class LibraryExporter:
 
     def loadFigureAssets(self, daz, figure):
         logger.info("loading figure {}".format(figure))
+        cache = dson.reader.cache
         skinBinding = None
         joints = None
         geometries = []
-        materials = []
         for asset in daz.assets:
-            if asset.isA(dson.types.Modifier):
-                skin = asset.propFind('skin')
-                if skin:
-                    node = skin.propGet('node')
-                    if node.isEq(figure):
-                        skinBinding = skin
-                        joints = skin.propFind('joints')
-                        pass
-                    pass
-                pass
-            elif asset.isA(dson.types.Geometry):
+            if asset.isA(dson.types.Geometry):
                 geometries.append(asset)
                 pass
-            elif asset.isA(dson.types.Material):
-                materials.append(asset)
-                pass
             elif asset.isA(dson.types.Image):
                 self.imageAdd(asset)
                 pass
             pass
+        # the skin binding of the figure
+        for target in dson.types.objInstances(figure):
+            for source, key in cache.referrers(target, 'node'):
+                if isinstance(source, dson.types.SkinBinding):
+                    skinBinding = source
+                    joints = source.propFind('joints')
+                    pass
+                pass
+            pass
         geometry = None
         if skinBinding:
             geometry = skinBinding.propGet('geometry')
@@ -347,10 +343,24 @@ class LibraryExporter:
         if default_uv_set:
             self.uvSetAdd(default_uv_set)
             pass
+        # the materials of the geometry or its instances
+        targets = []
+        for target in dson.types.objInstances(geometry):
+            targets.append(target)
+            for source, key in cache.referrers(target, 'url'):
+                targets.append(source)
+                pass
+            pass
         materialGroups = {}
-        for material in materials:
-            if geometry.isEq(material.propFind('geometry')):
-                self.materialAdd(material, materialGroups)
+        seen = set()
+        for target in targets:
+            if id(target) in seen:
+                continue
+            seen.add(id(target))
+            for source, key in daz.referrers(target, 'geometry'):
+                if source.isA(dson.types.Material):
+                    self.materialAdd(source, materialGroups)
+                    pass
                 pass
             pass
         nodeWeights = None
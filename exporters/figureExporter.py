@@ -67,6 +67,22 @@ parser.add_argument(
     default=False,
     help='overwrite output files'
 )
+parser.add_argument(
+    '-c',
+    dest='cacheDir',
+    metavar='DIRECTORY',
+    type=str,
+    default=None,
+    help='cache parsed DSON files in this directory, which must not be '
+    'writable by other users'
+)
+parser.add_argument(
+    '-n',
+    dest='indexFiles',
+    action='store_true',
+    default=False,
+    help='index the library directories instead of probing for each file'
+)
 parser.add_argument(
     '-l',
     dest='figureList',
@@ -89,6 +105,14 @@ if args.verbose:
 logging.basicConfig(**loggingConfig)
 logger = logging.getLogger(__name__)
 
+if args.cacheDir:
+    dson.reader.cache.diskCache = dson.reader.DiskCache(args.cacheDir)
+    pass
+if args.indexFiles:
+    # DAZ Studio resolves urls case insensitively
+    dson.reader.cache.fileIndex = dson.reader.FileIndex(caseInsensitive=True)
+    pass
+
 if args.includes is None:
     args.includes = []
     pass
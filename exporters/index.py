@@ -102,7 +102,7 @@ class IndexFiles:
 
     def indexFile(self, filePath, libraryDir):
         try:
-            data = dson.reader.cache.loadFile(filePath)
+            data = dson.reader.cache.loadFile(filePath, profile='info')
         except:
             logger.exception("{}: error parsing file".format(filePath))
             self.errors.append({
@@ -0,0 +1,102 @@
+import argparse
+import logging
+import os
+import sys
+
+# Examples:
+# python .\exporters\sidecars.py "/data/DAZ 3D/Genesis 8/Female/Genesis8Female.dsf"
+# python .\exporters\sidecars.py -r -c sidecars "/data/DAZ 3D/Genesis 8/Female"
+
+# pymod modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import dson.reader
+import dson.sidecar
+
+# command line options
+parser = argparse.ArgumentParser(
+    description='Write columnar binary sidecars for DSON files.'
+)
+parser.add_argument(
+    'paths',
+    metavar='PATH',
+    type=str,
+    nargs='+',
+    help='a DSON file (.dsf) or directory'
+)
+parser.add_argument(
+    '-v',
+    dest='verbose',
+    action='store_true',
+    default=False,
+    help='set logging level to DEBUG'
+)
+parser.add_argument(
+    '-c',
+    dest='sidecarDir',
+    metavar='DIRECTORY',
+    type=str,
+    default=None,
+    help='write the sidecars to this directory instead of next to the files'
+)
+parser.add_argument(
+    '-r',
+    dest='recursive',
+    action='store_true',
+    default=False,
+    help='process directories recursively'
+)
+parser.add_argument(
+    '-f',
+    dest='overwrite',
+    action='store_true',
+    default=False,
+    help='overwrite up to date sidecars'
+)
+args = parser.parse_args()
+
+# setup logging
+loggingConfig = {
+    'level': logging.INFO
+}
+if args.verbose:
+    loggingConfig['level'] = logging.DEBUG
+    pass
+logging.basicConfig(**loggingConfig)
+logger = logging.getLogger(__name__)
+
+FILE_EXTS = ('.dsf',)
+
+store = dson.sidecar.SidecarStore(args.sidecarDir)
+
+def processFile(path):
+    if not args.overwrite and store.isFresh(path):
+        logger.debug("{}: sidecar is up to date".format(path))
+        return
+    logger.info("{}: writing sidecar".format(path))
+    data = dson.reader.cache.loadFile(path)
+    store.write(path, data)
+    pass
+
+def processDir(path):
+    for name in sorted(os.listdir(path)):
+        filePath = path + "/" + name
+        root, ext = os.path.splitext(name)
+        if ext in FILE_EXTS:
+            processFile(filePath)
+        elif args.recursive and os.path.isdir(filePath):
+            processDir(filePath)
+            pass
+        pass
+    pass
+
+for path in args.paths:
+    located = dson.reader.cache.locateFile(path)
+    if located is None:
+        sys.exit("{}: can't locate path".format(path))
+        pass
+    if os.path.isdir(located):
+        processDir(located)
+    else:
+        processFile(located)
+        pass
+    pass
@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# pymod modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import dson.reader
+
+class Library:
+    """a temporary DSON library on the search path
+
+    dson.reader.cache is replaced by a Cache constructed with kwargs
+    until close().
+    """
+
+    def __init__(self, **kwargs):
+        self.root = tempfile.mkdtemp()
+        self.searchPath = list(dson.reader.SearchPath)
+        self.savedCache = dson.reader.cache
+        dson.reader.SearchPath[:] = [self.root]
+        self.cache = dson.reader.cache = dson.reader.Cache(**kwargs)
+        pass
+
+    def write(self, path, data):
+        filePath = self.root + path
+        os.makedirs(os.path.dirname(filePath), exist_ok=True)
+        with open(filePath, 'w') as fp:
+            json.dump(data, fp)
+            pass
+        return filePath
+
+    def close(self):
+        dson.reader.SearchPath[:] = self.searchPath
+        dson.reader.cache = self.savedCache
+        shutil.rmtree(self.root, ignore_errors=True)
+        pass
+    pass
+
+def channels(values):
+    return [
+        {'id': axis, 'type': 'float', 'value': value}
+        for axis, value in zip(('x', 'y', 'z'), values)
+    ]
+
+def node(id, parent=None, type='bone', center=(0, 0, 0)):
+    data = {
+        'id': id,
+        'name': id,
+        'type': type,
+        'center_point': channels(center),
+        'rotation': channels((0, 0, 0)),
+        'translation': channels((0, 0, 0)),
+        'scale': channels((1, 1, 1))
+    }
+    if parent is not None:
+        data['parent'] = parent
+        pass
+    return data
+
+def dsf(path, **libraries):
+    data = {
+        'file_version': '0.6.0.0',
+        'asset_info': {'id': path, 'type': 'figure'}
+    }
+    data.update(libraries)
+    return data
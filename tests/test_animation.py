@@ -0,0 +1,71 @@
+import unittest
+
+from library import Library, dsf
+
+import dson.animation
+import dson.types
+
+numpy = dson.animation.numpy
+
+def animation(axis, *keys):
+    return {
+        'url': 'name://@selection#hip:?rotation/{}/value'.format(axis),
+        'keys': [list(key) for key in keys]
+    }
+
+@unittest.skipIf(numpy is None, "requires numpy")
+class AnimationTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library()
+        self.library.write('/scene.duf', dsf(
+            '/scene.duf',
+            scene={
+                'nodes': [{'id': 'hip', 'url': '#hip-1'}],
+                'animations': [
+                    animation('x', (0, 0), (1, 10)),
+                    animation('y', (0, 1, ['constant']), (1, 5)),
+                    animation('z', (0, 0, ['hermite', 0, 2]),
+                              (1, 1, ['hermite', 0, 0])),
+                    animation('x', (0, 0, ['tcb', 0, 0, 0]),
+                              (1, 1, ['tcb', 0, 0, 0]),
+                              (2, 0, ['tcb', 0, 0, 0]))
+                ]
+            },
+            node_library=[{'id': 'hip-1', 'name': 'hip', 'type': 'figure',
+                           'rotation': [
+                               {'id': axis, 'type': 'float', 'value': 0}
+                               for axis in 'xyz'
+                           ]}]
+        ))
+        scene = self.library.cache.loadURL('/scene.duf')
+        self.sampler = dson.animation.AnimationSampler(scene)
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    def testChannels(self):
+        self.assertEqual(len(self.sampler.channels), 4)
+        for channel in self.sampler.channels:
+            self.assertIsInstance(channel, dson.types.Channel)
+            pass
+        self.assertEqual([channel.get('id')
+                          for channel in self.sampler.channels],
+                         ['x', 'y', 'z', 'x'])
+        pass
+
+    def testSample(self):
+        values = self.sampler.sample([-1, 0.5, 3])
+        self.assertEqual(values.shape, (3, 4))
+        # linear, constant, hermite with an out tangent of 2 and tcb
+        # with h10 * d0 + h01 * v1 = 0.125 * 0.5 + 0.5 * 1
+        self.assertEqual(values[1].tolist(), [5, 1, 0.75, 0.5625])
+        # the first and last values are held outside the keys
+        self.assertEqual(values[0].tolist(), [0, 1, 0, 0])
+        self.assertEqual(values[2].tolist(), [10, 5, 1, 0])
+        pass
+    pass
+
+if __name__ == '__main__':
+    unittest.main()
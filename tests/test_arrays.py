@@ -0,0 +1,187 @@
+import unittest
+
+from library import Library, dsf, node
+
+import dson.arrays
+import dson.sidecar
+
+numpy = dson.arrays.numpy
+
+class MorphTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library()
+        self.library.write('/data/figure.dsf', dsf(
+            '/data/figure.dsf',
+            geometry_library=[{
+                'id': 'geo',
+                'type': 'polygon_mesh',
+                'vertices': {
+                    'count': 3, 'values': [[0, 0, 0], [1, 0, 0], [0, 1, 0]]
+                },
+                'polylist': {'count': 1, 'values': [[0, 0, 0, 1, 2]]}
+            }],
+            modifier_library=[{
+                'id': 'smile',
+                'parent': '#geo',
+                'morph': {
+                    'vertex_count': 3,
+                    'deltas': {'count': 1, 'values': [[1, 0.5, 0, 0]]}
+                }
+            }]
+        ))
+        self.library.write('/scene.duf', dsf(
+            '/scene.duf',
+            scene={'modifiers': [
+                {'id': 'smile-1', 'url': '/data/figure.dsf#smile'}
+            ]}
+        ))
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    @unittest.skipIf(dson.arrays.numpy is None, "requires numpy")
+    def testInstance(self):
+        cache = self.library.cache
+        geometry = cache.loadURL('/data/figure.dsf#geo')
+        modifier = cache.loadURL('/scene.duf#smile-1')
+        self.assertIs(dson.arrays.morphGet(modifier),
+                      modifier.instDef['morph'])
+        vertices = dson.arrays.morphsApply(geometry, [(modifier, 2)])
+        self.assertEqual(vertices.tolist(),
+                         [[0, 0, 0], [2, 0, 0], [0, 1, 0]])
+        pass
+    pass
+
+class UVSetTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library()
+        self.path = self.library.write('/data/figure.dsf', dsf(
+            '/data/figure.dsf',
+            uv_set_library=[{
+                'id': 'uvs',
+                'vertex_count': 3,
+                'uvs': {'count': 4, 'values': [[0, 0], [1, 0], [0, 1], [1, 1]]},
+                'polygon_vertex_indices': [[0, 2, 3]]
+            }]
+        ))
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    def check(self, view):
+        self.assertEqual(view.uvs.shape, (4, 2))
+        self.assertEqual(view.uvs[3].tolist(), [1, 1])
+        self.assertEqual(view.polygonVertexIndices.tolist(), [[0, 2, 3]])
+        pass
+
+    @unittest.skipIf(dson.arrays.numpy is None, "requires numpy")
+    def testLists(self):
+        uvSet = self.library.cache.loadURL('/data/figure.dsf#uvs')
+        view = uvSet.arrays()
+        self.check(view)
+        self.assertTrue(view.uvs.flags.writeable)
+        pass
+
+    @unittest.skipIf(dson.arrays.numpy is None, "requires numpy")
+    def testSidecar(self):
+        cache = self.library.cache
+        cache.sidecars = dson.sidecar.SidecarStore()
+        dson.sidecar.write(self.path + dson.sidecar.EXT, self.path,
+                           cache.loadFile(self.path))
+        uvSet = cache.loadURL('/data/figure.dsf#uvs')
+        view = uvSet.arrays()
+        self.check(view)
+        # a read-only view of the memory-mapped column
+        self.assertFalse(view.uvs.flags.writeable)
+        pass
+    pass
+
+class SkinTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library()
+        self.library.write('/data/figure.dsf', dsf(
+            '/data/figure.dsf',
+            node_library=[node('hip', type='figure'), node('chest', '#hip')],
+            geometry_library=[{
+                'id': 'geo',
+                'type': 'polygon_mesh',
+                'vertices': {
+                    'count': 3, 'values': [[1, 1, 1], [0, 1, 0], [0, 0, 1]]
+                },
+                'polylist': {'count': 1, 'values': [[0, 0, 0, 1, 2]]}
+            }],
+            modifier_library=[{
+                'id': 'skin',
+                'parent': '#geo',
+                'skin': {
+                    'node': '#hip',
+                    'geometry': '#geo',
+                    'vertex_count': 3,
+                    'joints': [{
+                        'id': 'hip',
+                        'node': '#hip',
+                        'node_weights': {
+                            'count': 1, 'values': [[0, 0.25]]
+                        }
+                    }, {
+                        'id': 'chest',
+                        'node': '#chest',
+                        'node_weights': {
+                            'count': 2, 'values': [[1, 1], [0, 0.75]]
+                        }
+                    }]
+                }
+            }]
+        ))
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    def transforms(self, offset):
+        # hip in place, chest moved by offset
+        transforms = numpy.tile(numpy.eye(4), (2, 1, 1))
+        transforms[1, :3, 3] = offset
+        return transforms
+
+    @unittest.skipIf(dson.arrays.numpy is None, "requires numpy")
+    def testBlend(self):
+        cache = self.library.cache
+        binding = cache.loadURL('/data/figure.dsf#skin')['skin']
+        geometry = cache.loadURL('/data/figure.dsf#geo')
+        view = binding.arrays()
+        self.assertEqual(view.jointIds, ['hip', 'chest'])
+        self.assertEqual(view.dense().tolist(),
+                         [[0.25, 0.75], [0, 1], [0, 0]])
+        vertices = dson.arrays.skin(binding, self.transforms((2, 0, 0)),
+                                    geometry.arrays().vertices)
+        # 0.25 * (1, 1, 1) + 0.75 * (3, 1, 1), chest only, no weights
+        self.assertEqual(vertices.tolist(),
+                         [[2.5, 1, 1], [2, 1, 0], [0, 0, 1]])
+        pass
+
+    @unittest.skipIf(dson.arrays.numpy is None, "requires numpy")
+    def testBatch(self):
+        cache = self.library.cache
+        binding = cache.loadURL('/data/figure.dsf#skin')['skin']
+        vertices = cache.loadURL('/data/figure.dsf#geo').arrays().vertices
+        poses = numpy.stack([self.transforms((0, 0, 0)),
+                             self.transforms((0, -4, 0))])
+        result = dson.arrays.skin(binding, poses, vertices)
+        self.assertEqual(result.shape, (2, 3, 3))
+        self.assertEqual(result[0].tolist(), vertices.tolist())
+        self.assertEqual(result[1].tolist(),
+                         [[1, -2, 1], [0, -3, 0], [0, 0, 1]])
+        with self.assertRaises(Exception):
+            dson.arrays.skin(binding, numpy.eye(4)[None], vertices)
+            pass
+        pass
+    pass
+
+if __name__ == '__main__':
+    unittest.main()
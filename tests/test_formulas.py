@@ -0,0 +1,111 @@
+import unittest
+
+from library import Library, dsf, node
+
+import dson.formulas
+
+def control(id, value):
+    return {
+        'id': id,
+        'channel': {'id': 'value', 'type': 'float', 'value': value}
+    }
+
+def formula(output, operations, stage='sum'):
+    return {'output': output, 'stage': stage, 'operations': operations}
+
+def knots(url, *points):
+    # push the input and the knots of a spline
+    return ([{'op': 'push', 'url': url}] +
+            [{'op': 'push', 'val': list(point)} for point in points] +
+            [{'op': 'push', 'val': len(points)}])
+
+class FormulaTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library()
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    def engine(self, modifiers, hip=None):
+        hip = hip or node('hip', type='figure')
+        self.library.write('/data/figure.dsf', dsf(
+            '/data/figure.dsf', node_library=[hip],
+            modifier_library=modifiers
+        ))
+        figure = self.library.cache.loadURL('/data/figure.dsf')
+        return dson.formulas.FormulaEngine(figure)
+
+    def testClamped(self):
+        hip = node('hip', type='figure')
+        hip['rotation'][0].update({'clamped': True, 'min': -10, 'max': 10})
+        ctrl = control('ctrl', 0.5)
+        ctrl['formulas'] = [formula('#hip?rotation/x/value', [
+            {'op': 'push', 'url': '#ctrl?value'},
+            {'op': 'push', 'val': 180},
+            {'op': 'mult'}
+        ])]
+        engine = self.engine([ctrl], hip)
+        key = '/data/figure.dsf#hip?rotation/x/value'
+        self.assertEqual(engine.get(key), 10)
+        engine.set('/data/figure.dsf#ctrl?value', -0.01)
+        engine.update()
+        self.assertAlmostEqual(engine.get(key), -1.8)
+        pass
+
+    def testCurrentValue(self):
+        hip = node('hip', type='figure')
+        hip['rotation'][0]['current_value'] = 5
+        engine = self.engine([control('ctrl', 1)], hip)
+        slot = engine.slotGet(self.library.cache.cache['/data/figure.dsf'],
+                              '#hip?rotation/x/value')
+        self.assertEqual(engine.values[slot], 5)
+        pass
+
+    def testStages(self):
+        ctrl = control('ctrl', 2)
+        ctrl['formulas'] = [
+            formula('#out?value', [
+                {'op': 'push', 'url': '#ctrl?value'},
+                {'op': 'push', 'val': 3},
+                {'op': 'add'}
+            ]),
+            formula('#out?value', [
+                {'op': 'push', 'url': '#ctrl?value'}
+            ], stage='mult'),
+            formula('#out?value', [
+                {'op': 'push', 'val': 4}
+            ], stage='mult')
+        ]
+        engine = self.engine([ctrl, control('out', 1)])
+        # (1 + (2 + 3)) * 2 * 4
+        self.assertEqual(engine.get('/data/figure.dsf#out?value'), 48)
+        pass
+
+    def testSplines(self):
+        ctrl = control('ctrl', 0.5)
+        ctrl['formulas'] = [
+            formula('#constant?value', knots(
+                '#ctrl?value', (0, 1), (1, 2)
+            ) + [{'op': 'spline_constant'}]),
+            formula('#linear?value', knots(
+                '#ctrl?value', (0, 0), (1, 10)
+            ) + [{'op': 'spline_linear'}]),
+            formula('#tcb?value', knots(
+                '#ctrl?value', (0, 0, 0, 0, 0), (1, 1, 0, 0, 0),
+                (2, 0, 0, 0, 0)
+            ) + [{'op': 'spline_tcb'}])
+        ]
+        engine = self.engine([ctrl, control('constant', 0),
+                              control('linear', 0), control('tcb', 0)])
+        self.assertEqual(engine.get('/data/figure.dsf#constant?value'), 1)
+        self.assertEqual(engine.get('/data/figure.dsf#linear?value'), 5)
+        # h10 * d0 + h01 * k1 = 0.125 * 0.5 + 0.5 * 1
+        self.assertAlmostEqual(engine.get('/data/figure.dsf#tcb?value'),
+                               0.5625)
+        pass
+    pass
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from library import Library, dsf, node
+
+class LazyLibrariesTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library(lazyLibraries=True)
+        self.library.write('/data/figure.dsf', dsf(
+            '/data/figure.dsf',
+            node_library=[
+                node('hip', type='figure'), node('chest', '#hip'),
+                node('thigh', '/data/figure.dsf#hip'), node('neck', '#chest')
+            ],
+            modifier_library=[
+                {'id': 'mod{}'.format(i), 'parent': '#hip'} for i in range(20)
+            ]
+        ))
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    def children(self, node):
+        return [child.get('id') for child in node.children]
+
+    def testChildren(self):
+        figure = self.library.cache.loadURL('/data/figure.dsf')
+        hip = figure.idGet('hip')
+        self.assertEqual(self.children(hip), ['chest', 'thigh'])
+        self.assertEqual(self.children(figure.idGet('chest')), ['neck'])
+        self.assertEqual(self.children(figure.idGet('neck')), [])
+        # the modifiers parented to hip aren't children
+        self.assertEqual(len(figure.lazyIds), 20)
+        pass
+
+    def testChildrenLazyRefs(self):
+        self.library.cache.lazyRefs = True
+        figure = self.library.cache.loadURL('/data/figure.dsf')
+        hip = figure.idGet('hip')
+        self.assertEqual(self.children(hip), ['chest', 'thigh'])
+        # only the children were constructed
+        self.assertEqual(len(figure.lazyIds), 21)
+        self.assertIn('neck', figure.lazyIds)
+        pass
+
+    def testPropFind(self):
+        figure = self.library.cache.loadURL('/data/figure.dsf')
+        self.assertEqual(figure.propFind('asset_info')['id'],
+                         '/data/figure.dsf')
+        self.assertEqual(len(figure.lazyIds), 24)
+        # found by id, constructing it and its parent
+        self.assertEqual(figure.propFind('mod3')['id'], 'mod3')
+        self.assertEqual(len(figure.lazyIds), 22)
+        # the index includes the constructed entries
+        self.assertIs(figure.propFind('mod3', 'parent'), figure.idGet('hip'))
+        self.assertEqual(len(figure.lazyIds), 22)
+        pass
+    pass
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+from library import Library, dsf, node
+
+import dson.types
+
+class LazyRefsTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library(lazyRefs=True)
+        self.library.write('/data/figure.dsf', dsf(
+            '/data/figure.dsf',
+            node_library=[node('hip', type='figure'), node('chest', '#hip')]
+        ))
+        self.library.write('/scene.duf', dsf(
+            '/scene.duf',
+            scene={'nodes': [
+                {'id': 'hip', 'url': '/data/figure.dsf#hip'},
+                {'id': 'chest', 'url': '/data/figure.dsf#chest',
+                 'parent': '#hip'},
+                {'id': 'prop', 'url': '/data/figure.dsf#chest',
+                 'parent': '/data/missing.dsf#prop'}
+            ]}
+        ))
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    def testUnresolvableParent(self):
+        cache = self.library.cache
+        scene = cache.loadURL('/scene.duf')
+        self.assertEqual(list(cache.cache), ['/scene.duf'])
+        prop = scene.idGet('prop')
+        with self.assertRaises(Exception):
+            prop['parent'].obj
+            pass
+        pass
+
+    def testNoPrefetch(self):
+        cache = self.library.cache
+        paths = []
+        loadFile = cache.loadFile
+        def loadFileRecord(path, *args):
+            paths.append(path)
+            return loadFile(path, *args)
+        cache.loadFile = loadFileRecord
+        cache.loadURL('/scene.duf')
+        self.assertEqual(paths, [self.library.root + '/scene.duf'])
+        self.assertEqual(cache.prefetched, {})
+        pass
+
+    def testChildren(self):
+        scene = self.library.cache.loadURL('/scene.duf')
+        hip = scene.idGet('hip')
+        self.assertEqual([child.get('id') for child in hip.children],
+                         ['chest'])
+        self.assertTrue(hip['url'].isDeferred())
+        # the instDef is wired on first access
+        self.assertNotIn('/data/figure.dsf', self.library.cache.cache)
+        self.assertIsInstance(hip.instDef, dson.types.Figure)
+        self.assertEqual([child.get('id') for child in hip.instDef.children],
+                         ['chest'])
+        pass
+
+    def testReferrers(self):
+        cache = self.library.cache
+        scene = cache.loadURL('/scene.duf')
+        figure = cache.loadURL('/data/figure.dsf')
+        hip = figure.idGet('hip')
+        self.assertEqual(cache.referrers(hip, 'url'),
+                         [(scene.idGet('hip'), 'url')])
+        self.assertCountEqual(cache.referrers(hip),
+                         [(figure.idGet('chest'), 'parent'),
+                          (scene.idGet('hip'), 'url')])
+        self.assertEqual(cache.referrers(scene.idGet('hip'), 'parent'),
+                         [(scene.idGet('chest'), 'parent')])
+        pass
+    pass
+
+if __name__ == '__main__':
+    unittest.main()
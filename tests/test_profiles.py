@@ -0,0 +1,80 @@
+import unittest
+
+from library import Library, dsf, node
+
+import dson.types
+
+def geometry(id):
+    return {
+        'id': id,
+        'type': 'polygon_mesh',
+        'vertices': {'count': 3, 'values': [[0, 0, 0], [1, 0, 0], [0, 1, 0]]},
+        'polylist': {'count': 1, 'values': [[0, 0, 0, 1, 2]]}
+    }
+
+class ProfileTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library()
+        self.library.write('/data/figure.dsf', dsf(
+            '/data/figure.dsf',
+            node_library=[node('hip', type='figure'), node('chest', '#hip')],
+            geometry_library=[geometry('geo')]
+        ))
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    def sceneWrite(self, geometryUrl):
+        self.library.write('/scene.duf', dsf(
+            '/scene.duf',
+            scene={'nodes': [{
+                'id': 'hip',
+                'url': '/data/figure.dsf#hip',
+                'geometries': [{'id': 'geo', 'url': geometryUrl}]
+            }]}
+        ))
+        pass
+
+    def testInfo(self):
+        self.sceneWrite('/data/figure.dsf#geo')
+        cache = self.library.cache
+        scene = cache.loadURL('/scene.duf', profile='info')
+        self.assertEqual(sorted(scene.keys()), ['asset_info', 'file_version'])
+        self.assertEqual(list(cache.cache), ['/scene.duf'])
+        pass
+
+    def testUpgrade(self):
+        self.sceneWrite('/data/figure.dsf#geo')
+        cache = self.library.cache
+        scene = cache.loadURL('/scene.duf', profile='info')
+        self.assertIs(cache.loadURL('/scene.duf'), scene)
+        self.assertEqual(cache.profiles, {
+            '/scene.duf': 'full', '/data/figure.dsf': 'full'
+        })
+        geo = scene.idGet('hip')['geometries'][0]
+        self.assertIsInstance(geo.instDef, dson.types.Geometry)
+        pass
+
+    def testUpgradeFails(self):
+        self.sceneWrite('/data/figure.dsf#missing')
+        cache = self.library.cache
+        scene = cache.loadURL('/scene.duf', profile='info')
+        with self.assertRaises(Exception):
+            cache.loadURL('/scene.duf')
+            pass
+        self.assertEqual(cache.profiles['/scene.duf'], 'info')
+        self.assertNotIn('scene', scene)
+        self.assertEqual(scene.idMap, {})
+        self.assertEqual(scene.assets, [])
+        # the referenced file was loaded in full
+        self.assertEqual(cache.profiles['/data/figure.dsf'], 'full')
+        figure = cache.cache['/data/figure.dsf']
+        self.assertEqual(figure.referrers(figure.idGet('hip')),
+                         [(figure.idGet('chest'), 'parent')])
+        pass
+    pass
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import pickle
+import tempfile
+import unittest
+
+from library import Library, dsf, node
+
+import dson.reader
+
+class PrefetchTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library()
+        self.library.write('/data/figure.dsf', dsf(
+            '/data/figure.dsf', node_library=[node('hip', type='figure')]
+        ))
+        self.library.write('/data/other.dsf', dsf(
+            '/data/other.dsf', node_library=[node('hip', type='figure')]
+        ))
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    def testUnusedDropped(self):
+        # resolving fails before other.dsf is loaded
+        self.library.write('/scene.duf', dsf(
+            '/scene.duf',
+            scene={'nodes': [
+                {'id': 'a', 'url': '/data/figure.dsf#missing'},
+                {'id': 'b', 'url': '/data/other.dsf#hip'}
+            ]}
+        ))
+        cache = self.library.cache
+        with self.assertRaises(Exception):
+            cache.loadURL('/scene.duf')
+            pass
+        self.assertEqual(cache.prefetched, {})
+        pass
+    pass
+
+def cycleWrite(library):
+    # two files referencing each other
+    library.write('/data/a.dsf', dsf(
+        '/data/a.dsf', node_library=[
+            node('a0', type='figure'), node('a1', '/data/b.dsf#b0')
+        ]
+    ))
+    library.write('/data/b.dsf', dsf(
+        '/data/b.dsf', node_library=[
+            node('b0', type='figure'), node('b1', '/data/a.dsf#a0')
+        ]
+    ))
+    pass
+
+class AsyncTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library()
+        cycleWrite(self.library)
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    def testCycle(self):
+        cache = self.library.cache
+        a, b = asyncio.run(asyncio.wait_for(
+            cache.loadURLsAsync(['/data/a.dsf', '/data/b.dsf']), 5
+        ))
+        self.assertIs(a.idGet('a1')['parent'].obj, b.idGet('b0'))
+        self.assertIs(b.idGet('b1')['parent'].obj, a.idGet('a0'))
+        self.assertEqual(cache.pending, {})
+        self.assertEqual(cache.asyncWaits, {})
+        pass
+
+    def testThread(self):
+        # a thread loads the file while the task is starting
+        cache = self.library.cache
+        async def load():
+            task = asyncio.ensure_future(cache.loadURLAsync('/data/a.dsf'))
+            await asyncio.sleep(0)
+            loop = asyncio.get_running_loop()
+            return await asyncio.gather(task, loop.run_in_executor(
+                None, cache.loadURL, '/data/a.dsf'
+            ))
+        a, b = asyncio.run(asyncio.wait_for(load(), 5))
+        self.assertIs(a, b)
+        self.assertIs(cache.cache['/data/a.dsf'], a)
+        self.assertEqual(cache.inflight, {})
+        pass
+    pass
+
+class EvictTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library(memoryLimit=1)
+        cycleWrite(self.library)
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    def testCycle(self):
+        cache = self.library.cache
+        cache.loadURL('/data/a.dsf')
+        self.assertEqual(list(cache.cache), [])
+        self.assertEqual(cache.residentTotal, 0)
+        pass
+
+    def testActive(self):
+        cache = self.library.cache
+        cache.memoryLimit = None
+        cache.loadURL('/data/a.dsf')
+        self.assertEqual(list(cache.cache), ['/data/b.dsf', '/data/a.dsf'])
+        cache.memoryLimit = 1
+        with cache.referencing('/data/b.dsf'):
+            cache.evict()
+            pass
+        # a.dsf is referenced by b.dsf
+        self.assertEqual(sorted(cache.cache), ['/data/a.dsf', '/data/b.dsf'])
+        cache.evict()
+        self.assertEqual(list(cache.cache), [])
+        self.assertEqual(cache.pins, {})
+        pass
+
+    def testReferenced(self):
+        self.library.write('/scene.duf', dsf(
+            '/scene.duf', node_library=[node('c0', '/data/a.dsf#a0')]
+        ))
+        cache = self.library.cache
+        cache.memoryLimit = None
+        scene = cache.loadURL('/scene.duf')
+        a0 = scene.idGet('c0')['parent'].obj
+        # the referenced files are the least recently used
+        self.assertEqual(list(cache.cache),
+                         ['/data/b.dsf', '/data/a.dsf', '/scene.duf'])
+        cache.memoryLimit = sum(cache.residentBytes().values()) - 1
+        cache.evict()
+        self.assertEqual(sorted(cache.cache), ['/data/a.dsf', '/data/b.dsf'])
+        self.assertIs(cache.loadURL('/data/a.dsf#a0'), a0)
+        # evicting the scene unpins the cycle
+        cache.memoryLimit = 1
+        cache.evict()
+        self.assertEqual(list(cache.cache), [])
+        pass
+    pass
+
+class DiskCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library()
+        self.path = self.library.write('/data/a.dsf', dsf('/data/a.dsf'))
+        self.diskCache = dson.reader.DiskCache(
+            tempfile.mkdtemp(dir=self.library.root)
+        )
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    def entryPath(self):
+        return self.diskCache.entryPath(self.diskCache.keyGet(self.path)[0])
+
+    def testRoundTrip(self):
+        self.diskCache.put(self.path, {'a': 1})
+        self.assertEqual(self.diskCache.get(self.path), {'a': 1})
+        pass
+
+    def testUnsigned(self):
+        self.diskCache.put(self.path, {'a': 1})
+        entryPath = self.entryPath()
+        with open(entryPath, 'wb') as wb:
+            pickle.dump({'a': 2}, wb)
+            pass
+        self.assertIsNone(self.diskCache.get(self.path))
+        self.assertFalse(os.path.exists(entryPath))
+        pass
+
+    @unittest.skipIf(not hasattr(os, 'getuid'), "requires POSIX owners")
+    def testPublicKey(self):
+        self.diskCache.put(self.path, {'a': 1})
+        os.chmod(os.path.join(self.diskCache.path,
+                              dson.reader.DiskCache.KEY_FILE), 0o644)
+        with self.assertRaises(Exception):
+            dson.reader.DiskCache(self.diskCache.path).get(self.path)
+            pass
+        self.assertTrue(os.path.exists(self.entryPath()))
+        pass
+    pass
+
+class FileIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library()
+        self.path = self.library.write('/data/a.dsf', dsf('/data/a.dsf'))
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    def testTrailingSlash(self):
+        fileIndex = dson.reader.FileIndex([self.library.root + '/'])
+        self.assertEqual(fileIndex.locate('/data/a.dsf'), self.path)
+        pass
+    pass
+
+if __name__ == '__main__':
+    unittest.main()
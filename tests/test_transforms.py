@@ -0,0 +1,93 @@
+import unittest
+
+from library import Library, channels, dsf, node
+
+import dson.transforms
+
+numpy = dson.transforms.numpy
+
+def point(matrix, p):
+    return (matrix @ numpy.array(list(p) + [1]))[:3].round(6).tolist()
+
+@unittest.skipIf(numpy is None, "requires numpy")
+class TransformTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library()
+        pass
+
+    def tearDown(self):
+        self.library.close()
+        pass
+
+    def engine(self, *nodes):
+        self.library.write('/data/figure.dsf', dsf(
+            '/data/figure.dsf', node_library=list(nodes)
+        ))
+        figure = self.library.cache.loadURL('/data/figure.dsf')
+        return dson.transforms.TransformEngine(figure.idGet('hip'))
+
+    def testHierarchy(self):
+        hip = node('hip', type='figure')
+        hip['rotation'] = channels((0, 0, 90))
+        chest = node('chest', '#hip', center=(0, 1, 0))
+        chest['translation'] = channels((0, 1, 0))
+        engine = self.engine(hip, chest)
+        # chest moves up 1 then hip rotates x, y to -y, x
+        self.assertEqual(point(engine.worldGet('chest'), (0, 1, 0)),
+                         [-2, 0, 0])
+        self.assertEqual(point(engine.worldGet('hip'), (1, 0, 0)),
+                         [0, 1, 0])
+        pass
+
+    def testRotationOrder(self):
+        hip = node('hip', type='figure')
+        hip['rotation'] = channels((90, 90, 0))
+        hip['rotation_order'] = 'XYZ'
+        engine = self.engine(hip)
+        # about X first: (0, 1, 0) to (0, 0, 1), then about Y: (1, 0, 0)
+        self.assertEqual(point(engine.worldGet('hip'), (0, 1, 0)),
+                         [1, 0, 0])
+        pass
+
+    def testInheritsScale(self):
+        hip = node('hip', type='figure')
+        hip['scale'] = channels((2, 2, 2))
+        chest = node('chest', '#hip', center=(0, 1, 0))
+        neck = node('neck', '#hip', center=(0, 1, 0))
+        neck['inherits_scale'] = False
+        engine = self.engine(hip, chest, neck)
+        self.assertEqual(point(engine.worldGet('chest'), (0, 2, 0)),
+                         [0, 4, 0])
+        self.assertEqual(point(engine.worldGet('neck'), (0, 2, 0)),
+                         [0, 2, 0])
+        pass
+
+    def testUpdate(self):
+        engine = self.engine(
+            node('hip', type='figure'),
+            node('chest', '#hip', center=(0, 1, 0)),
+            node('neck', '#chest', center=(0, 2, 0)),
+            node('thigh', '#hip', center=(1, 0, 0))
+        )
+        hipWorld = engine.worldGet('hip').copy()
+        thighWorld = engine.worldGet('thigh').copy()
+        engine.set('chest', 'rotation', 90, axis='x')
+        changed = engine.update()
+        self.assertEqual(sorted(engine.nodes[i].get('id') for i in changed),
+                         ['chest', 'neck'])
+        # about x through the chest center: (0, 2, 0) to (0, 1, 1)
+        self.assertEqual(point(engine.worldGet('neck'), (0, 2, 0)),
+                         [0, 1, 1])
+        self.assertTrue((engine.worldGet('hip') == hipWorld).all())
+        self.assertTrue((engine.worldGet('thigh') == thighWorld).all())
+        self.assertEqual(len(engine.update()), 0)
+        # the skinning transform of the rest pose is the identity
+        engine.set('chest', 'rotation', 0, axis='x')
+        self.assertTrue(numpy.allclose(
+            engine.skinTransforms(['chest', 'neck']), numpy.eye(4)
+        ))
+        pass
+    pass
+
+if __name__ == '__main__':
+    unittest.main()
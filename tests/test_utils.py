@@ -0,0 +1,22 @@
+import json
+import unittest
+
+# puts the repo on sys.path
+import library
+
+import dson.utils
+
+class SizeOfTest(unittest.TestCase):
+    def testLazyArray(self):
+        values = [[i, i + 1, i + 2] for i in range(1000)]
+        raw = json.dumps(values)
+        lazy = dson.utils.LazyArray(raw)
+        self.assertGreater(dson.utils.sizeOf({'values': lazy}), len(raw))
+        lazy.materialize()
+        self.assertGreaterEqual(dson.utils.sizeOf({'values': lazy}),
+                                dson.utils.sizeOf(values))
+        pass
+    pass
+
+if __name__ == '__main__':
+    unittest.main()